@@ -0,0 +1,177 @@
+# app/db_conn.py
+from __future__ import annotations
+import atexit
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+
+from ledger.db import (
+    bootstrap,
+    ensure_default_accounts,
+    get_latest_fx,
+    balances_in_base,
+    get_accounts,
+    account_balances_native,
+    get_all_account_txn_counts,
+    transactions_joined_sql,
+    list_budgets,
+    list_rules,
+)
+from ledger.analytics import (
+    mtd_spend,
+    budget_vs_actual,
+    monthly_spend_series,
+    trend_summary,
+    spend_by_institution,
+    month_actuals_by_category,
+    read_frame,
+)
+
+
+# ── Shared SQLite connection ─────────────────────────────────────────────────
+@st.cache_resource(show_spinner=False)
+def get_conn(db_path: str) -> sqlite3.Connection:
+    """
+    Open (and initialize) the ledger DB once per process and reuse it across reruns.
+    cache_resource (not cache_data): sqlite3.Connection is unpicklable and must be
+    shared by reference. Default KRW/USD accounts are ensured on first open only.
+    단일 사용자 전제: 모든 세션/스레드가 sqlite3.Connection 하나를 공유한다 (check_same_thread=False).
+    연결이 하나라 WAL의 읽기/쓰기 병행이나 busy_timeout 대기는 세션 사이에 적용되지 않고,
+    트랜잭션 상태도 공유된다 — 한 세션의 commit()/rollback(`with conn:` 실패 포함)이
+    다른 세션의 진행 중인 배치까지 확정/취소할 수 있다. 여러 세션이 동시에 쓰는 사용은 지원하지 않는다.
+    """
+    conn = bootstrap(db_path)
+    conn.execute("PRAGMA optimize;")
+    ensure_default_accounts(conn, currencies=("KRW", "USD"))
+    atexit.register(_close_conn, conn)
+    return conn
+
+
+def _close_conn(conn: sqlite3.Connection) -> None:
+    """Process exit: fold the WAL back into the main file so it can't grow unbounded."""
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        conn.execute("PRAGMA optimize;")
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_defaults(db_path: str) -> dict:
+    """Default-account map {"KRW": id, "USD": id} (계정 생성/삭제 후 clear_cached_reads로 무효화)."""
+    return ensure_default_accounts(get_conn(db_path), currencies=("KRW", "USD"))
+
+
+# ── Cached reads (args are scalars → cheap, stable hash keys) ────────────────
+# conn은 인자로 넘기지 않고 내부에서 get_conn()으로 가져온다.
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_latest_fx(db_path: str, base: str, quote: str) -> Optional[dict]:
+    row = get_latest_fx(get_conn(db_path), base, quote)
+    return dict(row) if row else None
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_accounts(db_path: str) -> List[dict]:
+    return [dict(r) for r in get_accounts(get_conn(db_path))]
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_account_maps(db_path: str) -> Tuple[Dict[str, int], Dict[int, str]]:
+    """
+    Transactions 계정 셀렉트용 (label → id, id → label).
+    label: "id — name (institution) [CUR/type]" — 계정 CRUD 후 clear_cached_reads로 무효화.
+    """
+    label2id: Dict[str, int] = {}
+    for aid, name, inst, cur, typ, _ in get_accounts(get_conn(db_path), tuples=True):
+        label2id[f"{aid} — {name or ''} ({inst or ''}) [{(cur or '').upper()}/{typ or ''}]"] = int(aid)
+    return label2id, {v: k for k, v in label2id.items()}
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_account_balances_native(db_path: str) -> List[dict]:
+    return account_balances_native(get_conn(db_path))
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_account_txn_counts(db_path: str, include_deleted: bool = False) -> dict:
+    return get_all_account_txn_counts(get_conn(db_path), include_deleted=include_deleted)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_balances(db_path: str, base: str) -> dict:
+    return balances_in_base(get_conn(db_path), base=base)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_mtd_spend(db_path: str, base: str, hour_key: str, _now_utc: datetime) -> Optional[float]:
+    """
+    hour_key: _now_utc.strftime("%Y-%m-%d-%H") — 월/시간 경계에서 자연스럽게 키가 바뀐다.
+    _now_utc는 해시에서 제외(밑줄) → 키는 시간 단위 그대로, 값은 그 키를 만든 시각 기준으로 계산.
+    """
+    return mtd_spend(get_conn(db_path), base=base, now_utc=_now_utc)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_budget_vs_actual(db_path: str, base: str, year: int, month: int) -> pd.DataFrame:
+    return budget_vs_actual(get_conn(db_path), base=base, year=year, month=month)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_monthly_spend_series(db_path: str, base: str, months: int, category: Optional[str]) -> pd.Series:
+    return monthly_spend_series(get_conn(db_path), base=base, months=months, category=category)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_trend_summary(db_path: str, base: str, months: int, category: Optional[str]) -> dict:
+    """같은 키의 cached_monthly_spend_series를 재사용 → 조회/FX 환산은 키당 한 번."""
+    series = cached_monthly_spend_series(db_path, base, months, category)
+    return trend_summary(get_conn(db_path), base=base, months=months, category=category, series=series)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_spend_by_institution(db_path: str, base: str, start_iso: str, end_iso: str) -> pd.DataFrame:
+    """start/end는 정시 단위로 맞춰서 넘길 것 — 초 단위 now()를 그대로 쓰면 매 rerun 캐시 미스."""
+    return spend_by_institution(get_conn(db_path), base, start_iso, end_iso)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_transactions_joined(db_path: str, start_iso: str, end_iso: str,
+                               include_deleted: bool, limit: int) -> pd.DataFrame:
+    """
+    Transactions 편집기용 목록. end_iso는 분/정시 단위로 올림해서 넘길 것 (초 단위면 매번 미스).
+    튜플 fetchall → DataFrame (sqlite3.Row 객체를 행마다 만들지 않음).
+    """
+    q, params = transactions_joined_sql(start_iso=start_iso, end_iso=end_iso,
+                                        include_deleted=include_deleted, limit=limit)
+    return read_frame(get_conn(db_path), q, params)
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_budgets(db_path: str, month: Optional[str]) -> pd.DataFrame:
+    return pd.DataFrame(list_budgets(get_conn(db_path), month=month),
+                        columns=["id", "category", "amount", "currency", "month"])  # SELECT 순서 그대로
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_rules(db_path: str, include_disabled: bool) -> pd.DataFrame:
+    rows = list_rules(get_conn(db_path), include_disabled=include_disabled)
+    return pd.DataFrame(rows, columns=rows[0].keys()) if rows else pd.DataFrame()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_month_actuals(db_path: str, base: str, year: int, month: int) -> dict:
+    return month_actuals_by_category(get_conn(db_path), base=base, year=year, month=month)
+
+
+def clear_cached_reads() -> None:
+    """Call after any DB write so the next rerun re-reads fresh values."""
+    for fn in (get_defaults, cached_accounts, cached_account_maps, cached_account_balances_native, cached_account_txn_counts,
+               cached_latest_fx,
+               cached_balances, cached_mtd_spend, cached_budget_vs_actual, cached_monthly_spend_series,
+               cached_trend_summary, cached_spend_by_institution,
+               cached_transactions_joined, cached_budgets, cached_rules, cached_month_actuals):
+        fn.clear()
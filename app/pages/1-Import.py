@@ -1,18 +1,24 @@
 # app/pages/1-Import.py
+from collections import defaultdict
 from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 from app.ui import inject_css, fmt_money
+from app.db_conn import get_conn, get_defaults, clear_cached_reads
 
-from ledger.rules import apply_category_rules
-from ledger.db import bootstrap, ensure_default_accounts, add_transaction
+from ledger.rules import apply_prepared_rules, load_rules
+from ledger.db import add_transactions_bulk
 from ledger.importer import (
     dataframe_from_csv,
+    iter_csv_chunks,
+    mapping_columns,
+    mapping_dtypes,
     Mapping,
     Defaults,
     map_df_to_txns,
     mark_duplicates,
+    txn_insert_row,
     resolve_account_id,   # ✅ 계정 결정(자동 생성 포함)
 )
 
@@ -21,28 +27,39 @@ st.title("📥 CSV Import")
 inject_css()  # 라이트 테마 CSS (다크모드 없음)
 
 DB_PATH = str(Path(__file__).resolve().parents[1] / "db.sqlite3")
-conn = bootstrap(DB_PATH)
+conn = get_conn(DB_PATH)
 
 # 🔹 Simple Mode 기본: 통화별 기본 계정 (최종 fallback 용)
-default_acc = ensure_default_accounts(conn, currencies=("KRW", "USD"))  # {"KRW": id1, "USD": id2}
+default_acc = get_defaults(DB_PATH)  # {"KRW": id1, "USD": id2}
 
 uploaded = st.file_uploader("CSV 파일 업로드", type=["csv"])
 if not uploaded:
     st.info("CSV를 업로드하면 50행 미리보기를 보여줍니다.")
     st.stop()
 
+# 업로드 식별 키 (새 파일을 올리면 바뀜) — 캐시/Dry-run 결과의 키로 사용
+upload_key = (uploaded.name, getattr(uploaded, "size", None), getattr(uploaded, "file_id", None))
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _preview_csv(key: tuple, _file) -> pd.DataFrame:
+    """같은 업로드면 rerun마다 다시 파싱하지 않음 (_file은 해시 대상 제외, key로만 구분)."""
+    _file.seek(0)
+    return dataframe_from_csv(_file, nrows=50)
+
+# 미리보기/컬럼 목록은 앞 50행만 읽는다 (전체 파일은 Dry-run에서 청크로 스트리밍)
 try:
-    df = dataframe_from_csv(uploaded)
+    df = _preview_csv(upload_key, uploaded)
 except Exception as e:
     st.error(f"CSV 읽기 실패: {e}")
     st.stop()
 
 st.subheader("미리보기 (상위 50행)")
-st.caption(f"로드된 행 수: {len(df):,} rows")
-st.dataframe(df.head(50))
+st.caption(f"컬럼 {len(df.columns)}개 · 전체 행은 Dry-run 시 필요한 컬럼만 청크 단위로 읽습니다")
+st.dataframe(df)
 
 # --- 컬럼 매핑 ---
-cols = ["— (skip)"] + list(df.columns)
+SKIP = "— (skip)"
+cols = [SKIP] + list(df.columns)
 
 def pick(label, required=False):
     return st.selectbox(label + (" *" if required else ""), cols, index=1 if required else 0)
@@ -83,44 +100,47 @@ apply_rules = st.checkbox(
 mapping = Mapping(
     date=date_col,
     amount=amount_col,
-    currency=None if currency_col.startswith("—") else currency_col,
-    payee=None if payee_col.startswith("—") else payee_col,
-    category=None if category_col.startswith("—") else category_col,
-    notes=None if notes_col.startswith("—") else notes_col,
-    account=None if account_col.startswith("—") else account_col,              # ✅ 추가
-    institution=None if institution_col.startswith("—") else institution_col,  # ✅ 추가
+    currency=None if currency_col == SKIP else currency_col,
+    payee=None if payee_col == SKIP else payee_col,
+    category=None if category_col == SKIP else category_col,
+    notes=None if notes_col == SKIP else notes_col,
+    account=None if account_col == SKIP else account_col,              # ✅ 추가
+    institution=None if institution_col == SKIP else institution_col,  # ✅ 추가
 )
 
 if st.button("Dry-run (계정 매핑+중복 감지)"):
     with st.spinner("변환/라우팅 중…"):
-        txns = map_df_to_txns(df, mapping, defaults)
+        # 매핑된 컬럼만 청크 단위로 읽어 변환 (계정/기관 힌트는 txn에 함께 실림)
+        txns = []
+        try:
+            for chunk in iter_csv_chunks(uploaded, usecols=mapping_columns(mapping),
+                                         dtype=mapping_dtypes(mapping)):
+                txns.extend(map_df_to_txns(chunk, mapping, defaults))
+        except Exception as e:
+            st.error(f"CSV 읽기 실패: {e}")
+            st.stop()
         if not txns:
             st.error("매핑 결과가 비었습니다. 날짜/금액 컬럼을 다시 확인해주세요.")
             st.stop()
 
-        # 행별 계정 라우팅 + (룰 적용 선택 시) 카테고리 자동 분류 + 계정 단위 중복 감지
-        marked_all = []
+        # 행별 계정 라우팅 + (룰 적용 선택 시) 카테고리 자동 분류
+        by_account = defaultdict(list)  # account_id -> [txn index]
+        rules = load_rules(conn) if apply_rules else ()  # 룰은 한 번만 조회·전처리 (행마다 SELECT X)
+        rule_memo = {}  # (payee, institution) → category: 같은 가맹점 반복 행은 룰 평가 1회
+        account_memo = {}  # resolve_account_id: 같은 계정 힌트 조합은 조회 1회
         for i, t in enumerate(txns):
-            # 통화 결정 (없으면 기본통화)
-            cur = (t.get("currency") or defaults.currency).upper()
-
-            # 원본 DF에서 계정/기관 힌트 추출
-            acct_hint = None
-            inst_hint = None
-            if mapping.account and (mapping.account in df.columns):
-                v = df.iloc[i][mapping.account]
-                acct_hint = None if pd.isna(v) else str(v)
-            if mapping.institution and (mapping.institution in df.columns):
-                v = df.iloc[i][mapping.institution]
-                inst_hint = None if pd.isna(v) else str(v)
+            cur = t["currency"]  # map_df_to_txns에서 대문자/기본통화 처리 완료
+
+            acct_hint = t.get("account_hint")
+            inst_hint = t.get("institution_hint")
 
             # ✅ (선택) 룰을 사용한 카테고리 자동 분류
             if apply_rules:
-                cat2 = apply_category_rules(
-                    conn,
-                    payee=t.get("payee"),
-                    institution=(inst_hint if inst_hint else None),
-                )
+                rule_key = (t.get("payee"), inst_hint or None)
+                if rule_key not in rule_memo:
+                    rule_memo[rule_key] = apply_prepared_rules(
+                        rules, payee=rule_key[0], institution=rule_key[1])
+                cat2 = rule_memo[rule_key]
                 if cat2:
                     t["category"] = cat2  # 룰 매칭 시 CSV 카테고리를 덮어씀
 
@@ -133,51 +153,45 @@ if st.button("Dry-run (계정 매핑+중복 감지)"):
                 payee=t.get("payee"),
                 defaults_by_currency=default_acc,
                 auto_create=auto_create,
+                memo=account_memo,
             )
 
-            # ✅ 계정 단위로 중복 감지
-            flagged = mark_duplicates(conn, account_id, [t])[0]
-            flagged["account_id"] = account_id
-            marked_all.append(flagged)
+            by_account[account_id].append(i)
+
+        # ✅ 계정 단위로 중복 감지 (계정당 1회 조회) → 원래 순서로 되돌림
+        marked_all = [None] * len(txns)
+        for account_id, idxs in by_account.items():
+            flagged = mark_duplicates(conn, account_id, [txns[i] for i in idxs], inplace=True)
+            for i, f in zip(idxs, flagged):
+                f["account_id"] = account_id
+                marked_all[i] = f
 
+    st.session_state["import_dry_run"] = {"file": upload_key, "rows": marked_all}
+
+# Dry-run 결과는 session_state에 보관 → "DB에 삽입" 클릭으로 생기는 rerun에서도 유지
+dry = st.session_state.get("import_dry_run")
+marked_all = dry["rows"] if dry and dry["file"] == upload_key else None
+if marked_all:
     st.success(f"총 {len(marked_all)}건 변환됨. (룰 적용·계정 라우팅·중복 감지 완료)")
     st.write("중복(duplicate)이 True인 행은 기본적으로 삽입하지 않습니다.")
 
-    # ── 미리보기(가독성): 금액 포맷 컬럼 추가 ─────────────────────────────────
-    preview_df = pd.DataFrame(marked_all)
-    if not preview_df.empty:
-        preview_df["amount_fmt"] = preview_df.apply(
-            lambda r: fmt_money(r.get("amount"), (str(r.get("currency")) if r.get("currency") else "KRW")),
-            axis=1
-        )
-        preview_cols = [
-            "date_utc", "amount", "amount_fmt", "currency",
-            "category", "payee", "direction", "account_id", "duplicate"
-        ]
-        for c in preview_cols:
-            if c not in preview_df.columns:
-                preview_df[c] = None
-        st.dataframe(preview_df[preview_cols].head(100), use_container_width=True)
-    else:
-        st.dataframe(preview_df.head(100), use_container_width=True)
+    # ── 미리보기(가독성): 앞 100건만 DataFrame으로 만들고 금액 포맷 컬럼 추가 ──────
+    preview_cols = [
+        "date_utc", "amount", "amount_fmt", "currency",
+        "category", "payee", "direction", "account_id", "duplicate"
+    ]
+    head = marked_all[:100]
+    preview_df = pd.DataFrame(head, columns=preview_cols)
+    preview_df["amount_fmt"] = [fmt_money(t.get("amount"), t.get("currency") or "KRW") for t in head]
+    st.dataframe(preview_df, use_container_width=True)
 
     insert_mode = st.radio("삽입 모드", ["중복 제외(권장)", "중복도 강제 삽입"])
     if st.button("DB에 삽입"):
-        ins = 0
-        for t in marked_all:
-            if insert_mode == "중복 제외(권장)" and t["duplicate"]:
-                continue
-            add_transaction(
-                conn,
-                date_utc=t["date_utc"],
-                amount=t["amount"],
-                currency=t["currency"],     # 행의 실제 통화 유지
-                category=t["category"],
-                account_id=t["account_id"], # ✅ 통화가 아니라 '계정'으로 라우팅
-                direction=t["direction"],
-                notes=t.get("notes"),
-                payee=t.get("payee"),
-            )
-            ins += 1
+        skip_dups = insert_mode == "중복 제외(권장)"
+        # 행의 실제 통화 유지 + 통화가 아니라 '계정'(account_id)으로 라우팅
+        rows = [txn_insert_row(t) for t in marked_all if not (skip_dups and t["duplicate"])]
+        ins = add_transactions_bulk(conn, rows)  # 단일 트랜잭션 executemany
+        st.session_state.pop("import_dry_run", None)  # 같은 결과 중복 삽입 방지
+        clear_cached_reads()
         st.success(f"삽입 완료: {ins}건")
         st.toast("삽입이 끝났습니다. Dashboard/Transactions에서 확인하세요.", icon="✅")
@@ -1,30 +1,31 @@
 from pathlib import Path
-import pandas as pd
 import streamlit as st
 from app.ui import inject_css, metric_card, chip, area_chart, fmt_money
 
-from ledger.db import bootstrap
-from ledger.analytics import monthly_spend_series, trend_summary
+from app.db_conn import get_conn, cached_monthly_spend_series, cached_trend_summary
 
 st.title("📈 Trends (Non-parametric)")
 
 inject_css()
 
 DB_PATH = str(Path(__file__).resolve().parents[1] / "db.sqlite3")
-conn = bootstrap(DB_PATH)
+conn = get_conn(DB_PATH)
 
-col1, col2, col3 = st.columns(3)
-with col1:
-    base = st.selectbox("Base currency", ["KRW","USD"], index=0, help="FX 캐시 기준으로 환산")
-with col2:
-    months = st.slider("Lookback (months)", min_value=6, max_value=48, value=18, step=1)
-with col3:
-    # 최근 사용 카테고리 후보 추출 대신 사용자 입력형 유지
-    category = st.text_input("Filter by category (optional)", value="")
+# 컨트롤은 form으로 묶어 Apply 시 한 번만 rerun (슬라이더 드래그마다 재계산 방지)
+with st.form("trend_controls"):
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        base = st.selectbox("Base currency", ["KRW","USD"], index=0, help="FX 캐시 기준으로 환산")
+    with col2:
+        months = st.slider("Lookback (months)", min_value=6, max_value=48, value=18, step=1)
+    with col3:
+        # 최근 사용 카테고리 후보 추출 대신 사용자 입력형 유지
+        category = st.text_input("Filter by category (optional)", value="")
+    st.form_submit_button("Apply")
 
-# 시계열/요약
-series = monthly_spend_series(conn, base=base, months=months, category=(category or None))
-summ = trend_summary(conn, base=base, months=months, category=(category or None))
+# 시계열/요약 (같은 입력의 rerun은 캐시 히트)
+series = cached_monthly_spend_series(DB_PATH, base, months, category or None)
+summ = cached_trend_summary(DB_PATH, base, months, category or None)
 
 # 라벨링 로직
 def label_trend(summ):
@@ -55,7 +56,7 @@ st.info(f"Trend: **{label_trend(summ)}**  •  Theil–Sen slope ≈ **{slope_te
 st.subheader("Monthly spend (base)")
 
 # 시각화용 DataFrame
-df_plot = pd.DataFrame({"month": series.index, f"spend_{base}": series.values}).rename(columns={f"spend_{base}": "Spend"})
+df_plot = series.rename("Spend").rename_axis("month").reset_index()
 area_chart(df_plot, x="month", y="Spend")  # title은 생략(Altair v5 안전)
 st.caption(
     "Mann–Kendall: τ는 순위 기반 상관계수(−1~+1), p<0.05면 통계적으로 유의한 추세.\n"
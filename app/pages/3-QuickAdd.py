@@ -3,15 +3,16 @@ from datetime import datetime, timezone
 
 import streamlit as st
 from app.ui import inject_css, fmt_money
+from app.db_conn import get_conn, get_defaults, cached_accounts, clear_cached_reads
 
-from ledger.db import bootstrap, ensure_default_accounts, add_transaction, get_accounts
+from ledger.db import add_transaction
 
 st.title("⚡ Quick Add")
 inject_css()
 
 DB_PATH = str(Path(__file__).resolve().parents[1] / "db.sqlite3")
-conn = bootstrap(DB_PATH)
-defaults = ensure_default_accounts(conn, currencies=("KRW", "USD"))
+conn = get_conn(DB_PATH)
+defaults = get_defaults(DB_PATH)
 
 # 통화 선택
 col0, col1 = st.columns([1, 1])
@@ -20,9 +21,8 @@ with col0:
 
 # 계정 선택(해당 통화만)
 with col1:
-    # 1) 모든 계정 로드 후 dict로 변환
-    rows = get_accounts(conn)
-    acc_all = [dict(r) for r in rows]
+    # 1) 모든 계정 로드 (캐시; 계정 변경 시 clear_cached_reads로 무효화)
+    acc_all = cached_accounts(DB_PATH)
     # 2) 통화 필터 (키 없을 수도 있으므로 .get)
     acc_rows = [r for r in acc_all if str(r.get("currency", "")).upper() == currency]
 
@@ -30,28 +30,26 @@ with col1:
         st.warning("해당 통화의 계정이 없습니다. Accounts 페이지에서 먼저 생성하세요.")
         st.stop()
 
-    # 보기 좋은 라벨 구성 (dict 기반)
-    labels = []
-    for r in acc_rows:
+    # 보기 좋은 라벨 → account_id (dict 한 번 구성, 선택 후 O(1) 조회)
+    def _label(r):
         aid = int(r["id"])
-        name = r.get("name") or f"Account {aid}"
-        inst = r.get("institution") or ""
-        cur = str(r.get("currency", "")).upper()
-        label = f"{aid} — {name} ({inst}) [{cur}]"
-        labels.append((label, aid))
+        return f"{aid} — {r.get('name') or f'Account {aid}'} ({r.get('institution') or ''}) [{str(r.get('currency', '')).upper()}]"
 
-    label_list = [L for L, _ in labels]
+    labels = {_label(r): int(r["id"]) for r in acc_rows}
+    label_list = list(labels)
     # 기본 선택: 통화별 기본 계정(없으면 첫 번째)
-    default_id = defaults.get(currency)
-    default_label_idx = next((i for i, (_, aid) in enumerate(labels) if default_id and aid == int(default_id)), 0)
+    default_id = int(defaults.get(currency) or 0)
+    default_label_idx = next((i for i, aid in enumerate(labels.values()) if aid == default_id), 0)
     chosen_label = st.selectbox("Account (Bank/Card)", label_list, index=default_label_idx)
-    account_id = next(aid for L, aid in labels if L == chosen_label)
+    account_id = labels[chosen_label]
+
+NOW = datetime.now()
 
 with st.form("quick_add"):
     col1, col2, col3 = st.columns([1, 1, 1])
     with col1:
-        dt = st.date_input("Date", datetime.now().date())
-        tm = st.time_input("Time", datetime.now().time().replace(microsecond=0))
+        dt = st.date_input("Date", NOW.date())
+        tm = st.time_input("Time", NOW.time().replace(microsecond=0))
     with col2:
         amount = st.number_input("Amount", min_value=0.0, step=100.0, value=0.0, format="%.2f")
         direction = st.radio("Type", ["debit (지출)", "credit (수입)"], horizontal=True, index=0)
@@ -76,5 +74,10 @@ if submit:
         payee=payee or None,
         notes=notes or None,
     )
+    clear_cached_reads()
+    # 전체 rerun 없이 바로 확인 메시지 + 세션 누적 건수만 갱신 (폼 위젯 값은 그대로 유지)
+    st.session_state["quick_add_count"] = st.session_state.get("quick_add_count", 0) + 1
     st.success(f"Saved {fmt_money(amount, currency)} to account {account_id}. Enter 키로 다음 입력을 이어갈 수 있어요.")
-    st.rerun()
+
+if st.session_state.get("quick_add_count"):
+    st.caption(f"이번 세션에서 추가한 거래: {st.session_state['quick_add_count']}건")
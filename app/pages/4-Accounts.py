@@ -1,50 +1,66 @@
 from pathlib import Path
+
+import pandas as pd
 import streamlit as st
 
 from app.ui import inject_css, fmt_money
+from app.db_conn import (
+    get_conn,
+    cached_accounts,
+    cached_account_balances_native,
+    cached_account_txn_counts,
+    clear_cached_reads,
+)
 from ledger.db import (
-    bootstrap,
     add_account,
-    get_accounts,
-    get_account_by_id,
-    update_account,
-    delete_account,
-    count_account_transactions,
-    account_balances_native,
+    update_accounts_bulk,
+    delete_accounts,
 )
 
 st.title("🏦 Accounts (Banks/Cards)")
 inject_css()
 
 DB_PATH = str(Path(__file__).resolve().parents[1] / "db.sqlite3")
-conn = bootstrap(DB_PATH)
+conn = get_conn(DB_PATH)
+
+# 선택지는 모듈에서 한 번만 (렌더마다 리스트 생성 X)
+CURRENCIES = ("KRW", "USD")
+ACC_TYPES = ("checking", "savings", "card", "cash", "brokerage", "other")
+EDIT_COLS = ["name", "institution", "currency", "type", "opening_balance"]
 
 
 # ------------------------------
 # Dialogs
 # ------------------------------
-@st.dialog("Delete Account")
-def confirm_delete_dialog(acc_id: int, acc_name: str, txn_count: int):
-    st.warning(f"Are you sure you want to delete **{acc_name}**?")
-
-    if txn_count > 0:
+@st.dialog("Delete Accounts")
+def confirm_delete_dialog(targets: list):
+    """targets: [(id, name, txn_count)] — 선택된 계정 전부 (거래 0건이어도 확인을 거친다)."""
+    names = ", ".join(f"**{name}**" for _, name, _ in targets)
+    st.warning(f"Are you sure you want to delete {names}?")
+    total = sum(n for _, _, n in targets)
+    # txns 열은 삭제 제외 건수 → soft-delete된 행도 CASCADE로 영구 삭제되므로 따로 세서 알린다
+    all_counts = cached_account_txn_counts(DB_PATH, include_deleted=True)
+    hidden = sum(all_counts.get(aid, 0) for aid, _, _ in targets) - total
+    if total > 0:
         st.error(
-            f"⚠️ This account has **{txn_count}** transaction(s). Deleting it will also delete all associated transactions."
+            f"⚠️ These account(s) have **{total}** transaction(s). Deleting them will also delete all associated transactions."
         )
-    else:
-        st.info("This account has no transactions.")
+    if hidden > 0:
+        st.error(f"⚠️ **{hidden}** deleted (hidden) transaction(s) will also be permanently removed.")
+    if total == 0 and hidden == 0:
+        st.info("These account(s) have no transactions.")
 
     col1, col2 = st.columns(2)
     with col1:
         if st.button("✅ Confirm Delete", type="primary", use_container_width=True):
-            deleted = delete_account(conn, acc_id)
+            deleted = delete_accounts(conn, [aid for aid, _, _ in targets])
             if deleted:
-                st.success(f"✅ Account '{acc_name}' deleted successfully!")
-                st.session_state.pop(f"delete_account_{acc_id}", None)
-                st.rerun()
+                clear_cached_reads()
+            st.session_state.pop("accounts_pending_delete", None)
+            st.rerun()
     with col2:
         if st.button("❌ Cancel", use_container_width=True):
-            st.session_state.pop(f"delete_account_{acc_id}", None)
+            st.session_state.pop("accounts_pending_delete", None)
             st.rerun()
 
 
@@ -59,34 +75,54 @@ def create_success_dialog():
     st.success(f"Account created:\n\n**{name}** • {inst} • {fmt_money(ob, cur)}")
 
     if st.button("확인", type="primary", use_container_width=True):
-        # ✅ 폼 기본값을 session_state로만 제어 (위젯 측 기본값과 중복 지정 금지)
-        st.session_state.update({
-            "add_name": "",
-            "add_inst": "",
-            "add_currency": "USD",
-            "add_type": "card",
-            "add_opening": 0.0,
-        })
+        # ✅ 폼 초기화 = nonce 증가 → 새 key의 위젯이 기본값으로 다시 생성 (키별 리셋 불필요)
+        st.session_state["add_form_nonce"] += 1
         st.session_state.pop("create_success_payload", None)
         st.session_state["show_create_success"] = False
         st.rerun()
 
 
+# ------------------------------
+# Callbacks
+# ------------------------------
+def create_account_cb():
+    """Create Account 제출 콜백: 스크립트 rerun 전에 실행되므로 위젯 값은 session_state key로 읽는다."""
+    ss = st.session_state
+    nonce = ss["add_form_nonce"]
+    form = {f: ss[f"add_{f}_{nonce}"] for f in ("name", "inst", "currency", "type", "opening")}
+    if not form["name"]:
+        ss["add_error"] = True
+        return
+    add_account(
+        conn,
+        name=form["name"],
+        institution=form["inst"] or None,
+        currency=form["currency"],
+        type=form["type"],
+        opening_balance=form["opening"],
+    )
+    clear_cached_reads()
+    ss["create_success_payload"] = {
+        "name": form["name"],
+        "institution": form["inst"],
+        "currency": form["currency"],
+        "opening_balance": form["opening"],
+    }
+    ss["show_create_success"] = True
+
+
 # ------------------------------
 # Tabs
 # ------------------------------
-tab1, tab2 = st.tabs(["➕ Add Account", "📝 Manage Accounts"])
+# on_change="rerun": 선택된 탭 상태를 추적 → Manage 탭은 열려 있을 때만 조회/렌더 (계정 추가만 하는 경우 SQLite 읽기 0)
+tab1, tab2 = st.tabs(["➕ Add Account", "📝 Manage Accounts"], key="accounts_tab", on_change="rerun")
 
 # ============= TAB 1: Add Account =============
 with tab1:
     st.subheader("Create New Account")
 
-    # ⚙️ 위젯 기본값은 무조건 session_state로만 관리 (경고 방지)
-    st.session_state.setdefault("add_name", "")
-    st.session_state.setdefault("add_inst", "")
-    st.session_state.setdefault("add_currency", "USD")
-    st.session_state.setdefault("add_type", "card")
-    st.session_state.setdefault("add_opening", 0.0)
+    # 위젯 key에 nonce를 붙여 두고, 초기화가 필요하면 nonce만 올린다 (기본값은 위젯 인자로)
+    nonce = st.session_state.setdefault("add_form_nonce", 0)
 
     if st.session_state.get("show_create_success"):
         create_success_dialog()
@@ -94,145 +130,105 @@ with tab1:
     with st.form("add_account", enter_to_submit=False):
         col1, col2, col3 = st.columns(3)
         with col1:
-            name = st.text_input("Account name*", placeholder="Chase Sapphire", key="add_name")
-            institution = st.text_input("Institution (Bank)", placeholder="Chase", key="add_inst")
+            st.text_input("Account name*", placeholder="Chase Sapphire", key=f"add_name_{nonce}")
+            st.text_input("Institution (Bank)", placeholder="Chase", key=f"add_inst_{nonce}")
         with col2:
-            # ❌ index/value 지정 금지, ✅ key만 사용 (값은 session_state가 가짐)
-            currency = st.selectbox("Currency*", ["KRW", "USD"], key="add_currency")
-            acc_type = st.selectbox(
+            st.selectbox("Currency*", CURRENCIES, index=CURRENCIES.index("USD"), key=f"add_currency_{nonce}")
+            st.selectbox(
                 "Type",
-                ["checking", "savings", "card", "cash", "brokerage", "other"],
-                key="add_type"
+                ACC_TYPES,
+                index=ACC_TYPES.index("card"),
+                key=f"add_type_{nonce}"
             )
         with col3:
-            opening_balance = st.number_input(
+            st.number_input(
                 "Opening balance",
+                value=0.0,
                 step=100.0,
                 format="%.2f",
-                key="add_opening",
+                key=f"add_opening_{nonce}",
             )
 
-        submitted = st.form_submit_button("Create Account", type="primary")
-        if submitted:
-            if not name:
-                st.error("Account name is required")
-            else:
-                add_account(
-                    conn,
-                    name=name,
-                    institution=institution or None,
-                    currency=currency,
-                    type=acc_type,
-                    opening_balance=opening_balance,
-                )
-                st.session_state["create_success_payload"] = {
-                    "name": name,
-                    "institution": institution,
-                    "currency": currency,
-                    "opening_balance": opening_balance,
-                }
-                st.session_state["show_create_success"] = True
-                st.rerun()
+        # 생성은 on_click 콜백에서 → 제출로 생기는 rerun 한 번에 성공 다이얼로그까지 (st.rerun 불필요)
+        st.form_submit_button("Create Account", type="primary", on_click=create_account_cb)
+        if st.session_state.pop("add_error", None):
+            st.error("Account name is required")
 
 
 # ============= TAB 2: Manage Accounts =============
 with tab2:
-    st.subheader("Manage Existing Accounts")
-    rows = get_accounts(conn)
-
-    if not rows:
-        st.info("No accounts yet. Create one in the 'Add Account' tab.")
-    else:
-        # 현재 잔액(= opening + txns) 맵
-        bal_items = account_balances_native(conn)
-        bal_map = {it["account_id"]: float(it["balance_native"]) for it in bal_items}
-
-        def _ensure_full_row(rdict):
-            """필수 컬럼 누락 시 DB에서 재조회해 보강."""
-            needed = {"institution", "type", "opening_balance"}
-            if needed.issubset(set(rdict.keys())):
-                return rdict
-            full = get_account_by_id(conn, int(rdict["id"]))
-            return dict(full) if full else rdict
-
-        for r in rows:
-            rd = _ensure_full_row(dict(r))
-
-            acc_id = int(rd["id"])
-            acc_name = rd.get("name") or "(unnamed)"
-            acc_inst = (rd.get("institution") or "").strip() or "(no institution)"
-            acc_cur = str(rd.get("currency", "")).upper()
-            acc_type = rd.get("type") or "other"
-            acc_opening = float(rd.get("opening_balance") or 0.0)
-            acc_current_balance = bal_map.get(acc_id, acc_opening)
-
-            with st.expander(
-                f"**{acc_name}** ({acc_inst}) • {acc_cur} • {fmt_money(acc_current_balance, acc_cur)}",
-                expanded=False
-            ):
-                st.caption(
-                    f"Account ID: {acc_id} | Type: {acc_type} | "
-                    f"Opening: {fmt_money(acc_opening, acc_cur)} | "
-                    f"Current: {fmt_money(acc_current_balance, acc_cur)}"
-                )
-
-                txn_count = count_account_transactions(conn, acc_id)
-
-                with st.form(f"edit_account_{acc_id}"):
-                    st.write("**Edit Account**")
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        new_name = st.text_input("Name", value=acc_name, key=f"name_{acc_id}")
-                        new_inst = st.text_input(
-                            "Institution",
-                            value="" if acc_inst == "(no institution)" else acc_inst,
-                            key=f"inst_{acc_id}"
-                        )
-                        new_currency = st.selectbox(
-                            "Currency", ["KRW", "USD"],
-                            index=0 if acc_cur == "KRW" else 1,
-                            key=f"cur_{acc_id}"
-                        )
-                    with col2:
-                        new_type = st.selectbox(
-                            "Type",
-                            ["checking", "savings", "card", "cash", "brokerage", "other"],
-                            index=["checking", "savings", "card", "cash", "brokerage", "other"].index(acc_type)
-                            if acc_type in ["checking", "savings", "card", "cash", "brokerage", "other"] else 5,
-                            key=f"type_{acc_id}"
-                        )
-                        new_balance = st.number_input(
-                            "Opening balance",
-                            value=float(acc_opening),
-                            step=100.0,
-                            format="%.2f",
-                            key=f"bal_{acc_id}"
-                        )
-
-                    save_btn = st.form_submit_button("💾 Save Changes", type="primary")
-
-                    if save_btn:
-                        if not new_name:
-                            st.error("Account name cannot be empty")
+    if tab2.open:  # 다른 탭이 선택돼 있으면 계정/잔액/거래 수 조회와 data_editor 렌더를 건너뜀
+        st.subheader("Manage Existing Accounts")
+        rows = cached_accounts(DB_PATH)  # 위젯 조작 rerun마다 재조회하지 않음 (쓰기 후 clear_cached_reads)
+
+        if not rows:
+            st.info("No accounts yet. Create one in the 'Add Account' tab.")
+        else:
+            # 계정 N개 × (expander+form+위젯) 대신 data_editor 하나로 편집
+            df = pd.DataFrame(rows, columns=["id"] + EDIT_COLS)
+            df["institution"] = df["institution"].fillna("")
+
+            # 현재 잔액(= opening + txns)은 계정 프레임에 한 번에 merge (잔액 없는 계정은 opening 그대로)
+            bal_df = pd.DataFrame(cached_account_balances_native(DB_PATH), columns=["account_id", "balance_native"])
+            df = df.merge(bal_df.rename(columns={"account_id": "id"}), on="id", how="left")
+            df["balance_native"] = df["balance_native"].fillna(df["opening_balance"])
+            df["current"] = [fmt_money(b, c) for b, c in zip(df["balance_native"], df["currency"])]
+            # 계정별 거래 수도 GROUP BY 한 번으로 (계정마다 COUNT 쿼리 X)
+            df["txns"] = df["id"].map(cached_account_txn_counts(DB_PATH)).fillna(0).astype(int)
+            df["delete"] = False
+
+            st.caption("Tip: 셀을 직접 수정한 뒤 Save changes, 삭제할 계정은 Delete? 체크 후 Delete selected.")
+            edited = st.data_editor(
+                df,
+                column_config={
+                    "id": st.column_config.NumberColumn("ID"),
+                    "name": st.column_config.TextColumn("Name", required=True),
+                    "institution": st.column_config.TextColumn("Institution"),
+                    "currency": st.column_config.SelectboxColumn("Currency", options=CURRENCIES, required=True),
+                    "type": st.column_config.SelectboxColumn("Type", options=ACC_TYPES, required=True),
+                    "opening_balance": st.column_config.NumberColumn("Opening balance", format="%.2f", step=100.0),
+                    "balance_native": None,  # 숫자 잔액은 숨기고 포맷된 Current만 표시
+                    "current": st.column_config.TextColumn("Current"),
+                    "txns": st.column_config.NumberColumn("Txns"),
+                    "delete": st.column_config.CheckboxColumn("Delete?"),
+                },
+                hide_index=True,
+                disabled=["id", "current", "txns"],
+                use_container_width=True,
+                key="accounts_editor",
+            )
+
+            colA, colB = st.columns(2)
+            with colA:
+                if st.button("💾 Save changes", type="primary"):
+                    before = df.set_index("id")[EDIT_COLS]
+                    after = edited.set_index("id")[EDIT_COLS]
+                    after["institution"] = after["institution"].fillna("").str.strip()
+                    changed = after[(before != after).any(axis=1)]
+                    if (changed["name"].fillna("").str.strip() == "").any():
+                        st.error("Account name cannot be empty")
+                    else:
+                        # 바뀐 행 전부를 한 트랜잭션으로 (executemany, commit 1회)
+                        # "" → None: object로 바꾼 뒤 mask (str dtype에서 replace/mask는 None 대신 NaN을 넣음)
+                        inst = changed["institution"].astype(object)
+                        updates = (changed.assign(institution=inst.mask(inst.eq(""), None),
+                                                  opening_balance=changed["opening_balance"].fillna(0.0))
+                                   .reset_index().to_dict("records"))
+                        updated = update_accounts_bulk(conn, updates)
+                        if updated:
+                            clear_cached_reads()
+                            st.rerun()
                         else:
-                            updated = update_account(
-                                conn,
-                                acc_id,
-                                name=new_name,
-                                institution=(new_inst or None),
-                                currency=new_currency,
-                                type=new_type,
-                                opening_balance=new_balance
-                            )
-                            if updated:
-                                st.success(f"✅ Account '{new_name}' updated successfully!")
-                                st.rerun()
-                            else:
-                                st.warning("No changes made")
-
-                st.divider()
-                if st.button("🗑️ Delete Account", key=f"del_{acc_id}", type="secondary"):
-                    st.session_state[f"delete_account_{acc_id}"] = True
-
-                if st.session_state.get(f"delete_account_{acc_id}", False):
-                    confirm_delete_dialog(acc_id, acc_name, txn_count)
+                            st.warning("No changes made")
+            with colB:
+                if st.button("🗑️ Delete selected", type="secondary"):
+                    sel = edited[edited["delete"]]
+                    # 거래 수와 상관없이 모든 삭제는 확인 다이얼로그를 거친다
+                    pending = [(int(aid), name, int(n)) for aid, name, n in zip(sel["id"], sel["name"], sel["txns"])]
+                    if pending:
+                        st.session_state["accounts_pending_delete"] = pending
+                        st.rerun()
+                    st.info("No selection.")
+
+            if st.session_state.get("accounts_pending_delete"):
+                confirm_delete_dialog(st.session_state["accounts_pending_delete"])
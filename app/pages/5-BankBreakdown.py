@@ -3,17 +3,15 @@ from pathlib import Path
 from datetime import datetime, timedelta, timezone
 
 import streamlit as st
-import pandas as pd
 
-from app.ui import inject_css, bar_chart, fmt_money
-from ledger.db import bootstrap
-from ledger.analytics import spend_by_institution
+from app.ui import inject_css, bar_chart, fmt_money_series
+from app.db_conn import get_conn, cached_spend_by_institution
 
 st.title("🏦 Bank / Card Breakdown")
 inject_css()
 
 DB_PATH = str(Path(__file__).resolve().parents[1] / "db.sqlite3")
-conn = bootstrap(DB_PATH)
+conn = get_conn(DB_PATH)
 
 col1, col2, col3 = st.columns(3)
 with col1:
@@ -21,14 +19,16 @@ with col1:
 with col2:
     months = st.slider("최근 N개월", 1, 24, 6, 1)
 with col3:
-    end = datetime.now(timezone.utc)
+    # 다음 정시로 올림: 같은 시간대의 rerun/슬라이더 재방문은 같은 캐시 키 + 방금 입력한 거래도 범위에 포함
+    end = (datetime.now(timezone.utc) + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
     start = end - timedelta(days=months * 31)
     st.write(f"{start.date()} ~ {end.date()}")
 
-start_iso = start.strftime("%Y-%m-%dT%H:%M:%SZ")
-end_iso = end.strftime("%Y-%m-%dT%H:%M:%SZ")
+# 고정 포맷 + UTC(초 이하 0) → strftime 대신 isoformat 후 오프셋만 Z로
+start_iso = start.isoformat().replace("+00:00", "Z")
+end_iso = end.isoformat().replace("+00:00", "Z")
 
-df = spend_by_institution(conn, base, start_iso, end_iso)
+df = cached_spend_by_institution(DB_PATH, base, start_iso, end_iso)
 if df.empty:
     st.info("데이터가 없습니다. 몇 건 입력·임포트한 뒤 다시 시도하세요.")
 else:
@@ -39,7 +39,7 @@ else:
 
     # 표: 금액은 포맷 적용해서 별도 컬럼으로 표시
     df_show = df.copy()
-    df_show[f"amount_{base}"] = df_show["amount_base"].map(lambda x: fmt_money(float(x or 0.0), base))
+    df_show[f"amount_{base}"] = fmt_money_series(df_show["amount_base"], base)
     st.dataframe(df_show[["institution", f"amount_{base}", "count"]]
                  .rename(columns={"institution": "Institution", f"amount_{base}": f"Amount ({base})", "count": "Count"}),
                  use_container_width=True)
@@ -5,17 +5,15 @@ import pandas as pd
 import streamlit as st
 
 from app.ui import inject_css, fmt_money
-from ledger.db import (
-    bootstrap, list_transactions_joined, update_transaction, soft_delete_transaction,
-    get_accounts  # ✅ get_accounts_full 대신 사용
-)
-from ledger.rules import apply_category_rules  # 선택: 룰 재적용 버튼용
+from app.db_conn import get_conn, cached_account_maps, cached_transactions_joined, clear_cached_reads
+from ledger.db import bulk_update_transactions, soft_delete_transactions
+from ledger.rules import bulk_reapply_rules  # 선택: 룰 재적용 버튼용
 
 st.title("🧾 Transactions — Edit & Delete")
 inject_css()
 
 DB_PATH = str(Path(__file__).resolve().parents[1] / "db.sqlite3")
-conn = bootstrap(DB_PATH)
+conn = get_conn(DB_PATH)
 
 col1, col2, col3 = st.columns(3)
 with col1:
@@ -25,120 +23,124 @@ with col2:
 with col3:
     limit = st.selectbox("Limit", [100, 200, 300, 500], index=2)
 
-end = datetime.now(timezone.utc)
+# 다음 분으로 올림 → 같은 분 안의 rerun은 캐시 히트 (쓰기 후에는 clear_cached_reads로 무효화)
+end = datetime.now(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
 start = end - timedelta(days=days)
-rows = list_transactions_joined(
-    conn,
-    start_iso=start.strftime("%Y-%m-%dT%H:%M:%SZ"),
-    end_iso=end.strftime("%Y-%m-%dT%H:%M:%SZ"),
-    include_deleted=include_deleted,
-    limit=int(limit),
+df = cached_transactions_joined(
+    DB_PATH,
+    start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    bool(include_deleted),
+    int(limit),
 )
 
-if not rows:
+if df.empty:
     st.info("No transactions in range.")
     st.stop()
 
-df = pd.DataFrame([dict(r) for r in rows])  # dict로 변환하여 안전 조작
-
 # 보기용 금액 포맷 컬럼 추가 (에디터에서는 읽기 전용)
 df["amount_fmt"] = df.apply(
     lambda r: fmt_money(float(r.get("amount") or 0.0), str(r.get("currency") or "")),
     axis=1,
 )
 
-# 계정 셀렉트 옵션 구성 (get_accounts → dict 변환 후 안전 라벨)
-acc_rows = [dict(r) for r in get_accounts(conn)]
-acc_options = {}
-for a in acc_rows:
-    aid = int(a["id"])
-    name = a.get("name") or ""
-    inst = a.get("institution") or ""
-    cur = str(a.get("currency", "")).upper()
-    typ = a.get("type") or ""
-    label = f"{aid} — {name} ({inst}) [{cur}/{typ}]"
-    acc_options[label] = aid
-
-# id → label 역맵
-id2label = {v: k for k, v in acc_options.items()}
+# 계정 셀렉트 옵션 (label ↔ id 맵은 캐시에서 → rerun마다 계정 루프 재구성 X)
+acc_options, id2label = cached_account_maps(DB_PATH)
+acc_label2id = pd.Series(acc_options, dtype="int64")
 
 # 편집용 보조 컬럼
 df["delete"] = False
 df["undelete"] = False
-df["account_label"] = df["account_id"].map(lambda x: id2label.get(int(x), str(x)))
-
-st.caption("Tip: Account 드롭다운으로 계정 변경, Delete/Undelete 체크 후 각 버튼으로 일괄 적용.")
-
-edited = st.data_editor(
-    df[[
-        "id", "date_utc", "amount", "amount_fmt", "currency",
-        "account_label", "institution", "direction", "category", "payee", "notes",
-        "is_deleted", "delete", "undelete"
-    ]],
-    column_config={
-        "amount": st.column_config.NumberColumn("Amount (raw)", disabled=True),
-        "amount_fmt": st.column_config.TextColumn("Amount", disabled=True),
-        "account_label": st.column_config.SelectboxColumn(
-            "Account",
-            options=list(acc_options.keys()),
-            help="계정을 변경하면 account_id가 갱신됩니다.",
-        ),
-        "is_deleted": st.column_config.CheckboxColumn("Deleted", disabled=True),
-        "delete": st.column_config.CheckboxColumn("Delete?"),
-        "undelete": st.column_config.CheckboxColumn("Undelete?"),
-    },
-    hide_index=True,
-    disabled=["id", "date_utc", "currency", "institution", "is_deleted"],
-    use_container_width=True,
-    key="txn_editor_v2",
-)
-
-colA, colB, colC, colD = st.columns(4)
-
-with colA:
-    if st.button("Apply changes"):
-        changed = 0
-        for _, row in edited.iterrows():
-            orig = df[df["id"] == row["id"]].iloc[0]
-            fields = {}
-            # 계정 변경
-            if row["account_label"] != orig["account_label"]:
-                fields["account_id"] = acc_options[row["account_label"]]
-            # 텍스트 필드
-            for c in ["direction", "category", "payee", "notes"]:
-                if str(row[c]) != str(orig[c]):
-                    fields[c] = row[c] if pd.notna(row[c]) else None
-            if fields:
-                changed += update_transaction(conn, int(row["id"]), **fields)
-        st.success(f"Updated {changed} row(s)." if changed else "No changes.")
-        st.rerun()
-
-with colB:
-    if st.button("Delete selected"):
-        deleted = 0
-        for _, row in edited.iterrows():
-            if bool(row.get("delete")) and not bool(row.get("is_deleted", False)):
-                deleted += soft_delete_transaction(conn, int(row["id"]), True)
-        st.success(f"Deleted {deleted} row(s)." if deleted else "No selection.")
-        st.rerun()
-
-with colC:
-    if st.button("Undelete selected"):
-        restored = 0
-        for _, row in edited.iterrows():
-            if bool(row.get("undelete")) and bool(row.get("is_deleted", False)):
-                restored += soft_delete_transaction(conn, int(row["id"]), False)
-        st.success(f"Restored {restored} row(s)." if restored else "No selection.")
-        st.rerun()
-
-with colD:
-    if st.button("Re-apply rules to selected"):
-        updated = 0
-        for _, row in edited.iterrows():
-            if bool(row.get("delete")) or bool(row.get("undelete")):
-                continue
-            new_cat = apply_category_rules(conn, payee=row.get("payee"), institution=row.get("institution"))
-            if new_cat and new_cat != row.get("category"):
-                updated += update_transaction(conn, int(row["id"]), category=new_cat)
-        st.success(f"Rules applied to {updated} row(s)." if updated else "No changes.")
-        st.rerun()
+acc_ids = df["account_id"].astype("int64")
+df["account_label"] = acc_ids.map(id2label).fillna(acc_ids.astype(str))
+
+# ── Editor + 일괄 버튼 ───────────────────────────────────────────────────────
+# 셀 편집/체크는 이 fragment만 rerun (상단 조회·프레임 구성은 건너뜀).
+# 쓰기 후의 st.rerun()은 기본 scope="app" → 전체 rerun으로 새 데이터를 다시 읽는다.
+@st.fragment
+def edit_fragment(df: pd.DataFrame, acc_options: dict, acc_label2id: pd.Series):
+    st.caption("Tip: Account 드롭다운으로 계정 변경, Delete/Undelete 체크 후 각 버튼으로 일괄 적용.")
+
+    edited = st.data_editor(
+        df[[
+            "id", "date_utc", "amount", "amount_fmt", "currency",
+            "account_label", "institution", "direction", "category", "payee", "notes",
+            "is_deleted", "delete", "undelete"
+        ]],
+        column_config={
+            "amount": st.column_config.NumberColumn("Amount (raw)", disabled=True),
+            "amount_fmt": st.column_config.TextColumn("Amount", disabled=True),
+            "account_label": st.column_config.SelectboxColumn(
+                "Account",
+                options=list(acc_options.keys()),
+                help="계정을 변경하면 account_id가 갱신됩니다.",
+            ),
+            "is_deleted": st.column_config.CheckboxColumn("Deleted", disabled=True),
+            "delete": st.column_config.CheckboxColumn("Delete?"),
+            "undelete": st.column_config.CheckboxColumn("Undelete?"),
+        },
+        hide_index=True,
+        disabled=["id", "date_utc", "currency", "institution", "is_deleted"],
+        use_container_width=True,
+        key="txn_editor_v2",
+    )
+
+    colA, colB, colC, colD = st.columns(4)
+
+    with colA:
+        if st.button("Apply changes"):
+            # id로 정렬을 맞춘 뒤 컬럼별로 한 번에 비교 (행마다 df 재필터링/Series 생성 X) → 바뀐 행만 순회
+            cmp_cols = ["account_label", "direction", "category", "payee", "notes"]
+            ed = edited.set_index("id")
+            before = df.set_index("id").loc[ed.index, cmp_cols].astype("string").fillna("")
+            diff = ed[cmp_cols].astype("string").fillna("").ne(before)
+            hit = diff.any(axis=1)
+            # 계정 라벨 → id는 바뀐 행 전체를 한 번에 변환
+            vals_df = ed.loc[hit, cmp_cols]
+            vals_df = vals_df.assign(account_label=vals_df["account_label"].map(acc_label2id))
+            updates = []
+            for txn_id, flags, vals in zip(ed.index[hit],
+                                           diff[hit].itertuples(index=False),
+                                           vals_df.itertuples(index=False)):
+                fields = {}
+                for c, flag, v in zip(cmp_cols, flags, vals):
+                    if not flag:
+                        continue
+                    if c == "account_label":  # 계정 변경
+                        if pd.notna(v):
+                            fields["account_id"] = int(v)
+                    else:                     # 텍스트 필드
+                        fields[c] = v if pd.notna(v) else None
+                updates.append((int(txn_id), fields))
+            changed = bulk_update_transactions(conn, updates)  # 한 트랜잭션 (행마다 commit X)
+            clear_cached_reads()
+            st.success(f"Updated {changed} row(s)." if changed else "No changes.")
+            st.rerun()
+
+    with colB:
+        if st.button("Delete selected"):
+            sel = edited["delete"].astype(bool) & ~edited["is_deleted"].astype(bool)
+            deleted = soft_delete_transactions(conn, edited.loc[sel, "id"].tolist(), True)
+            clear_cached_reads()
+            st.success(f"Deleted {deleted} row(s)." if deleted else "No selection.")
+            st.rerun()
+
+    with colC:
+        if st.button("Undelete selected"):
+            sel = edited["undelete"].astype(bool) & edited["is_deleted"].astype(bool)
+            restored = soft_delete_transactions(conn, edited.loc[sel, "id"].tolist(), False)
+            clear_cached_reads()
+            st.success(f"Restored {restored} row(s)." if restored else "No selection.")
+            st.rerun()
+
+    with colD:
+        if st.button("Re-apply rules to selected"):
+            # 체크되지 않은 행만 대상 → 룰 평가/UPDATE는 DB에서 한 번에
+            keep = ~(edited["delete"].astype(bool) | edited["undelete"].astype(bool))
+            updated = bulk_reapply_rules(conn, include_deleted=True, txn_ids=edited.loc[keep, "id"].tolist())
+            clear_cached_reads()
+            st.success(f"Rules applied to {updated} row(s)." if updated else "No changes.")
+            st.rerun()
+
+
+edit_fragment(df, acc_options, acc_label2id)
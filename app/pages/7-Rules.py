@@ -5,20 +5,17 @@ from datetime import datetime, timedelta, timezone
 import pandas as pd
 import streamlit as st
 from app.ui import inject_css
+from app.db_conn import get_conn, cached_rules, clear_cached_reads
 
-from ledger.db import (
-    bootstrap,
-    add_rule, list_rules, update_rule, delete_rule,
-    list_transactions_joined, update_transaction
-)
-from ledger.rules import apply_category_rules
+from ledger.db import add_rule, bulk_update_rules, delete_rule
+from ledger.rules import apply_category_rules, bulk_reapply_rules
 
 st.title("🧩 Category Rules")
 inject_css()
 
 # 모든 페이지가 루트 db.sqlite3를 보도록 고정
 DB_PATH = str(Path(__file__).resolve().parents[1] / "db.sqlite3")
-conn = bootstrap(DB_PATH)
+conn = get_conn(DB_PATH)
 
 st.caption("priority가 낮을수록 먼저 평가합니다(ASC). match_type: contains | regex")
 
@@ -47,6 +44,7 @@ with st.form("add_rule", enter_to_submit=False):
         else:
             add_rule(conn, pattern=pattern, category=category, match_type=mtype,
                      institution=(inst or None), priority=int(prio), enabled=bool(enabled))
+            clear_cached_reads()
             st.success("Rule created.")
             st.rerun()
 
@@ -55,8 +53,7 @@ with st.form("add_rule", enter_to_submit=False):
 # ──────────────────────────────────────────────────────────────────────────────
 st.subheader("Rules (edit inline)")
 
-rows = list_rules(conn, include_disabled=True)
-df = pd.DataFrame([dict(r) for r in rows]) if rows else pd.DataFrame()
+df = cached_rules(DB_PATH, True)
 
 if df.empty:
     st.info("No rules yet. 상단에서 새 룰을 추가하세요.")
@@ -79,15 +76,21 @@ else:
     colA, colB = st.columns([1,1])
     with colA:
         if st.button("Apply changes"):
-            changed = 0
-            for _, row in edited.iterrows():
-                orig = df[df["id"]==row["id"]].iloc[0]
-                fields = {}
-                for c in ["pattern","match_type","category","institution","priority","enabled"]:
-                    if str(row[c]) != str(orig[c]):
-                        fields[c] = (None if (pd.isna(row[c]) or row[c]=="") else row[c])
-                if fields:
-                    changed += update_rule(conn, int(row["id"]), **fields)
+            # Transactions 페이지와 같은 방식: id 정렬 후 컬럼별 일괄 비교 → 바뀐 행만 순회
+            cmp_cols = ["pattern","match_type","category","institution","priority","enabled"]
+            ed = edited.set_index("id")
+            before = df.set_index("id").loc[ed.index, cmp_cols].astype("string").fillna("")
+            diff = ed[cmp_cols].astype("string").fillna("").ne(before)
+            hit = diff.any(axis=1)
+            updates = []
+            for rule_id, flags, vals in zip(ed.index[hit],
+                                            diff[hit].itertuples(index=False),
+                                            ed.loc[hit, cmp_cols].itertuples(index=False)):
+                fields = {c: (None if (pd.isna(v) or v=="") else v)
+                          for c, flag, v in zip(cmp_cols, flags, vals) if flag}
+                updates.append((int(rule_id), fields))
+            changed = bulk_update_rules(conn, updates)  # 한 트랜잭션 (행마다 commit X)
+            clear_cached_reads()
             st.success(f"Updated {changed} rule(s)." if changed else "No changes.")
             st.rerun()
 
@@ -95,6 +98,7 @@ else:
         del_id = st.selectbox("Delete rule id", options=list(edited["id"]), index=0)
         if st.button("Delete selected rule"):
             delete_rule(conn, int(del_id))
+            clear_cached_reads()
             st.success(f"Deleted rule {del_id}.")
             st.rerun()
 
@@ -140,17 +144,11 @@ with st.expander("설명 및 실행", expanded=False):
     st.caption(f"적용 범위(UTC): {start_iso} ~ {end_iso}")
 
     if st.button("Apply rules now"):
-        rows = list_transactions_joined(conn,
-                                        start_iso=start_iso,
-                                        end_iso=end_iso,
-                                        include_deleted=include_deleted,
-                                        limit=int(limit))
-        if not rows:
-            st.info("해당 범위에 거래가 없습니다.")
-        else:
-            updated = 0
-            for r in rows:
-                new_cat = apply_category_rules(conn, payee=r["payee"], institution=r["institution"])
-                if new_cat and new_cat != r["category"]:
-                    updated += update_transaction(conn, int(r["id"]), category=new_cat)
-            st.success(f"Rules applied to {updated} transaction(s).")
+        # 거래별 룰 평가 + UPDATE 반복 대신 SQL 한 문장으로 (ledger.rules.bulk_reapply_rules)
+        updated = bulk_reapply_rules(conn,
+                                     start_iso=start_iso,
+                                     end_iso=end_iso,
+                                     include_deleted=include_deleted,
+                                     limit=int(limit))
+        clear_cached_reads()
+        st.success(f"Rules applied to {updated} transaction(s).")
@@ -2,18 +2,19 @@
 from pathlib import Path
 from datetime import datetime
 
+import numpy as np
 import streamlit as st
 import pandas as pd
 from app.ui import inject_css, fmt_money
+from app.db_conn import get_conn, cached_budgets, cached_month_actuals, clear_cached_reads
 
-from ledger.db import bootstrap, list_budgets, upsert_budget
-from ledger.analytics import month_actuals_by_category
+from ledger.db import upsert_budgets_many
 
 st.title("📊 Budget vs Actual")
 inject_css()
 
 DB_PATH = str(Path(__file__).resolve().parents[1] / "db.sqlite3")
-conn = bootstrap(DB_PATH)
+conn = get_conn(DB_PATH)
 
 col1, col2, col3 = st.columns(3)
 with col1:
@@ -26,72 +27,68 @@ with col3:
 
 # ── 예산 입력/수정 ───────────────────────────────────────────────────────────
 st.subheader("예산 설정")
-budgets = list_budgets(conn, month=f"{year:04d}-{month:02d}")
-existing = {(b["category"], b["currency"]): float(b["amount"]) for b in budgets}
-
-categories = sorted({k for k,_ in existing.keys()} | {"Food","Transport","Coffee","Groceries","Housing","Utilities","Shopping","Entertainment"})
-rows = []
-for cat in categories:
-    amt = existing.get((cat, base), 0.0)
-    rows.append({"Category": cat, f"Budget ({base})": amt})
-df = pd.DataFrame(rows)
-
-edited = st.data_editor(df, use_container_width=True, num_rows="dynamic")
-if st.button("Save budgets"):
-    saved = 0
-    for _, r in edited.iterrows():
-        cat = str(r["Category"])
-        amt = float(r.get(f"Budget ({base})") or 0.0)
-        if amt > 0:
-            upsert_budget(conn, category=cat, amount=amt, currency=base, month=f"{year:04d}-{month:02d}")
-            saved += 1
-    st.success(f"Saved/updated {saved} budget row(s).")
-
-# ── 실적 계산 ────────────────────────────────────────────────────────────────
-st.subheader("이번 달 실적")
-actuals = month_actuals_by_category(conn, base=base, year=int(year), month=int(month))
-
-# 진행률 표/바
-progress = []
-total_budget = 0.0
-total_actual = 0.0
-for _, r in edited.iterrows():
-    cat = str(r["Category"])
-    b = float(r.get(f"Budget ({base})") or 0.0)
-    a = float(actuals.get(cat, 0.0))
-    total_budget += b
-    total_actual += a
-    pct = (a / b * 100.0) if b > 0 else None
-    badge = "—"
-    if pct is not None:
-        if pct >= 100:
-            badge = "🔴 Over"
-        elif pct >= 80:
-            badge = "🟠 80%+"
-        else:
-            badge = "🟢 OK"
-    progress.append({
-        "Category": cat,
+monthly_key = f"{year:04d}-{month:02d}"
+bdf = cached_budgets(DB_PATH, monthly_key)
+
+# 기준통화 예산: 해당 월 지정 우선 → 없으면 공통(NULL) (정렬 + drop_duplicates 한 번)
+cur = bdf[bdf["currency"].eq(base)]
+cur = (cur.sort_values("month", key=lambda m: m.eq(monthly_key), ascending=False, kind="stable")
+          .drop_duplicates("category", keep="first"))
+existing = dict(zip(cur["category"], cur["amount"].astype(float)))
+
+categories = sorted(set(bdf["category"]) | {"Food","Transport","Coffee","Groceries","Housing","Utilities","Shopping","Entertainment"})
+df = pd.DataFrame({
+    "Category": categories,
+    f"Budget ({base})": [existing.get(cat, 0.0) for cat in categories],
+})
+
+actuals = cached_month_actuals(DB_PATH, base, int(year), int(month))
+
+
+# 예산 셀 편집 → 진행률 갱신은 이 fragment만 rerun (상단 월/예산/실적 조회는 건너뜀)
+@st.fragment
+def budget_fragment(df: pd.DataFrame, actuals: dict, base: str, monthly_key: str):
+    edited = st.data_editor(df, use_container_width=True, num_rows="dynamic")
+    if st.button("Save budgets"):
+        amounts = edited[f"Budget ({base})"].fillna(0.0).astype(float)
+        keep = amounts > 0
+        # 양수 예산만 한 트랜잭션으로 upsert (행마다 commit X)
+        saved = upsert_budgets_many(conn, [(str(cat), amt, base, monthly_key)
+                                           for cat, amt in zip(edited.loc[keep, "Category"], amounts[keep])])
+        clear_cached_reads()
+        st.success(f"Saved/updated {saved} budget row(s).")
+
+    # ── 실적 계산 ────────────────────────────────────────────────────────────────
+    st.subheader("이번 달 실적")
+
+    # 진행률 표/바 (행 루프 없이 컬럼 단위로 한 번에 계산)
+    b = edited[f"Budget ({base})"].fillna(0.0).astype(float).to_numpy()
+    a = edited["Category"].astype(str).map(actuals).fillna(0.0).astype(float).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(b > 0, a / b * 100.0, np.nan)
+    badge = np.select([pct >= 100, pct >= 80, pct >= 0], ["🔴 Over", "🟠 80%+", "🟢 OK"], default="—")  # NaN → 전부 False
+
+    df_prog = pd.DataFrame({
+        "Category": edited["Category"].astype(str).to_numpy(),
         "Actual_raw": a,
         "Budget_raw": b,
-        "Progress": (None if pct is None else round(pct, 1)),
-        "Status": badge
+        "Progress": np.round(pct, 1),
+        "Status": badge,
     })
+    total_budget = float(b.sum())
+    total_actual = float(a.sum())
+
+    # 표시는 Styler로만 포맷 (숫자 컬럼 그대로 → 정렬도 금액/진행률 기준)
+    df_show = df_prog.rename(columns={"Actual_raw": f"Actual ({base})", "Budget_raw": f"Budget ({base})"})
+    styler = df_show.style.format(lambda v: fmt_money(v, base), subset=[f"Actual ({base})", f"Budget ({base})"])
+    styler = styler.format("{:.1f}%", subset=["Progress"], na_rep="—")
+    st.dataframe(styler, use_container_width=True)
+
+    # 상단 요약 메트릭 (일관 포맷)
+    st.metric("Total Actual", fmt_money(total_actual, base))
+    st.metric("Total Budget", fmt_money(total_budget, base))
+    if total_budget > 0:
+        st.metric("Total Progress", f"{total_actual/total_budget*100:,.1f}%")
+
 
-df_prog = pd.DataFrame(progress)
-
-# 표시용 포맷 컬럼 추가 (원본 숫자 유지)
-if not df_prog.empty:
-    df_show = df_prog.copy()
-    df_show[f"Actual ({base})"] = df_show["Actual_raw"].map(lambda x: fmt_money(float(x or 0.0), base))
-    df_show[f"Budget ({base})"] = df_show["Budget_raw"].map(lambda x: fmt_money(float(x or 0.0), base))
-    df_show = df_show[["Category", f"Actual ({base})", f"Budget ({base})", "Progress", "Status"]]
-    st.dataframe(df_show, use_container_width=True)
-else:
-    st.dataframe(df_prog, use_container_width=True)
-
-# 상단 요약 메트릭 (일관 포맷)
-st.metric("Total Actual", fmt_money(total_actual, base))
-st.metric("Total Budget", fmt_money(total_budget, base))
-if total_budget > 0:
-    st.metric("Total Progress", f"{total_actual/total_budget*100:,.1f}%")
+budget_fragment(df, actuals, base, monthly_key)
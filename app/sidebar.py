@@ -0,0 +1,122 @@
+# app/sidebar.py
+from __future__ import annotations
+import os
+from datetime import date, datetime, timezone, timedelta
+from typing import Optional
+
+import streamlit as st
+
+from app.ui import metric_card, fmt_money
+from app.db_conn import get_conn, cached_latest_fx, clear_cached_reads
+from ledger.db import count_rows, upsert_fx_cache_many
+from ledger.fx.fred import fetch_dexkous, dexkous_rows
+from ledger.backup import ensure_daily_backup_async, create_backup, list_backups
+
+
+# ── FRED fetch (같은 기간 반복 클릭은 1시간 동안 메모리에서) ─────────────────
+@st.cache_data(ttl=3600, show_spinner=False)
+def _fetch_dexkous_cached(start: date, end: date) -> list:
+    return fetch_dexkous(start, end)
+
+# ── Recent backups (rerun마다 디렉터리 스캔 방지, 30초 캐시) ──────────────────
+@st.cache_data(ttl=30, show_spinner=False)
+def _recent_backups() -> list:
+    return [b.name for b in list_backups(limit=5)]
+
+
+# ── Sidebar (DB 상태 · FX · Backups · Quit) ─────────────────────────────────
+def render_sidebar(db_path: str) -> Optional[dict]:
+    """
+    Render the shared sidebar and return the latest cached USD→KRW row
+    (dict or None) so callers can reuse it without another lookup.
+    """
+    latest = None
+    with st.sidebar:
+        st.subheader("Database")
+        try:
+            # 캐시된 연결 재사용 (최초 1회 KRW/USD 기본 계정 보장)
+            conn = get_conn(db_path)
+            acc_n = count_rows(conn, "accounts")
+            txn_n = count_rows(conn, "transactions")
+            st.success(f"Connected · accounts={acc_n}, transactions={txn_n}")
+        except Exception as e:
+            st.error(f"DB error: {e}")
+
+        st.divider()
+
+        # ── FX (USD→KRW) ─────────────────────────────────────────────────────
+        with st.expander("FX · USD→KRW", expanded=True):
+            latest = cached_latest_fx(db_path, "USD", "KRW")
+            col_fx, col_btn = st.columns([2, 1])
+
+            # ① FX 표시 전용 플레이스홀더
+            with col_fx:
+                fx_box = st.empty()
+
+                def render_fx(info):
+                    fx_box.empty()
+                    with fx_box.container():
+                        if info:
+                            metric_card(
+                                "USD→KRW",
+                                fmt_money(info["rate"], "KRW"),
+                                sub=f"As of {info['date_utc']} • {info['source']}",
+                            )
+                        else:
+                            st.warning("No FX cached yet.")
+
+                # 최초 1회 렌더
+                render_fx(latest)
+
+            # ② 버튼 클릭 시 DB 갱신 후, 같은 플레이스홀더에 재렌더 (중복 방지)
+            with col_btn:
+                if st.button("Fetch latest", help="Fetch last ~14 days from FRED (DEXKOUS)"):
+                    end = datetime.now(timezone.utc).date()
+                    if latest and latest["date_utc"] >= end.isoformat():
+                        # 오늘자 환율이 이미 캐시됨 → 네트워크 호출 생략
+                        st.toast("FX already up to date", icon="ℹ️")
+                    else:
+                        try:
+                            start = end - timedelta(days=14)
+                            observations = _fetch_dexkous_cached(start, end)  # 외부 API 호출 (1시간 캐시)
+                            n = upsert_fx_cache_many(conn, dexkous_rows(observations))
+                            clear_cached_reads()  # FX 변경 → 환율/환산 잔액 캐시 무효화
+                            st.toast(f"FX updated: {n} row(s)", icon="✅")
+                            # 갱신된 경우에만 재조회 → 같은 박스에 덮어쓰기
+                            latest = cached_latest_fx(db_path, "USD", "KRW")
+                            render_fx(latest)
+                        except Exception as e:
+                            st.error(f"Fetch failed: {e}")
+
+        st.divider()
+
+        # ── Backups (auto daily + manual) ─────────────────────────────────────
+        with st.expander("Backups", expanded=False):
+            try:
+                # 하루 1회 자동(백그라운드), 최근 5개만 보관
+                if ensure_daily_backup_async(db_path, keep_last=5) is not None:
+                    st.info("Creating today's auto backup in the background.")
+            except Exception as e:
+                st.warning(f"Auto-backup skipped: {e}")
+
+            if st.button("Create backup now"):
+                try:
+                    dest = create_backup(db_path, keep_last=5)
+                    _recent_backups.clear()
+                    st.success(f"Backup: {dest.name}")
+                except Exception as e:
+                    st.error(f"Backup failed: {e}")
+
+            st.caption("Recent backups (max 5)")
+            backs = _recent_backups()
+            if backs:
+                for name in backs:
+                    st.write("• ", name)
+            else:
+                st.write("No backups yet")
+
+        st.divider()
+        if st.button("Quit app", type="secondary", help="Terminate the local server"):
+            os._exit(0)
+
+    return latest
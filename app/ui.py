@@ -1,5 +1,6 @@
 # app/ui.py
 from __future__ import annotations
+from functools import lru_cache
 import streamlit as st
 import altair as alt
 import pandas as pd
@@ -33,8 +34,15 @@ def inject_css(
     - sticky_offset: sticky header offset for dataframes
     - max_width: increase page content width (e.g., '1500px', '85vw')
     """
-    st.markdown(
-        f"""
+    st.markdown(_css(pad_top, sticky_offset, max_width), unsafe_allow_html=True)
+
+@lru_cache(maxsize=8)
+def _css(pad_top: str, sticky_offset: str, max_width: str) -> str:
+    """
+    CSS 문자열은 인자 조합당 프로세스에서 한 번만 생성.
+    순수 문자열 함수라 lru_cache로 충분 (cache_data의 인자 해시/pickle 복사 비용 없음).
+    """
+    return f"""
 <style>
 :root {{
   --pl-pad-top: {pad_top};
@@ -120,58 +128,89 @@ div[data-testid="stFormSubmitter"] [aria-live="polite"] {{
   display:none !important; opacity:0 !important; height:0 !important; margin:0 !important; padding:0 !important; overflow:hidden !important;
 }}
 </style>
-""",
-        unsafe_allow_html=True,
-    )
+"""
 
 # ── Display components ───────────────────────────────────────────────────────
 def metric_card(label: str, value: str, sub: Optional[str] = None) -> None:
-    st.markdown(
-        f"""
+    st.markdown(_metric_card_html(label, value, sub), unsafe_allow_html=True)
+
+@lru_cache(maxsize=256)
+def _metric_card_html(label: str, value: str, sub: Optional[str]) -> str:
+    # 같은 (label, value, sub)는 rerun마다 반복되므로 HTML 문자열을 메모이즈
+    return f"""
 <div class="pl-card">
   <div class="pl-label">{label}</div>
   <div class="pl-value">{value}</div>
   {"<div class='pl-sub'>" + sub + "</div>" if sub else ""}
 </div>
-""",
-        unsafe_allow_html=True,
-    )
+"""
 
 def chip(text: str, tone: str = "info") -> None:
+    st.markdown(_chip_html(text, tone), unsafe_allow_html=True)
+
+@lru_cache(maxsize=256)
+def _chip_html(text: str, tone: str) -> str:
     tone = tone if tone in {"info","warn","danger"} else "info"
-    st.markdown(f"""<span class="pl-chip {tone}">{text}</span>""", unsafe_allow_html=True)
+    return f"""<span class="pl-chip {tone}">{text}</span>"""
 
 # ── Charts (Altair, pastel) ─────────────────────────────────────────────────
+def _altair_data(df: pd.DataFrame, cols: tuple) -> tuple:
+    """
+    인코딩에 쓰는 컬럼만 열 배열 → records로 직접 만들어 alt.Data(values=...)로 넘긴다.
+    Altair의 DataFrame sanitize/타입 추론을 건너뛰므로 각 필드 타입(Q/N)도 여기서 함께 반환.
+    NaN은 JSON null로 (NaN 리터럴은 유효한 JSON이 아님).
+    """
+    arrays, types = [], {}
+    for c in cols:
+        col = df[c]
+        if pd.api.types.is_numeric_dtype(col):
+            types[c] = "quantitative"
+            arrays.append([None if v != v else v for v in col.astype(float).tolist()])
+        else:
+            types[c] = "nominal"
+            arrays.append([None if pd.isna(v) else str(v) for v in col.tolist()])
+    values = [dict(zip(cols, row)) for row in zip(*arrays)]
+    return alt.Data(values=values), types
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _chart_spec(df: pd.DataFrame, kind: str, x: str, y: str, title: Optional[str]) -> dict:
+    """
+    Altair → Vega-Lite spec(dict) 변환(스키마 검증 포함)은 (df, 인코딩 인자)별로 한 번만.
+    kind: "area" | "bar"
+    """
+    props = {"title": title} if title else {}
+    data, t = _altair_data(df, (x, y))
+    tooltip = [alt.Tooltip(x, type=t[x]), alt.Tooltip(y, type=t[y])]
+    if kind == "area":
+        chart = (
+            alt.Chart(data)
+               .mark_area(opacity=0.5, line={"color": PALETTE["mint"], "width": 2})
+               .encode(
+                   x=alt.X(x, type=t[x], sort=None, axis=alt.Axis(labelAngle=0)),
+                   y=alt.Y(y, type=t[y], stack=None),
+                   tooltip=tooltip,
+               )
+               .properties(height=260, **props)  # 한 번의 체인 (중간 Chart 재바인딩 X)
+        )
+    else:
+        chart = (
+            alt.Chart(data)
+               .mark_bar(cornerRadiusTopLeft=4, cornerRadiusTopRight=4)
+               .encode(
+                   x=alt.X(x, type=t[x], sort='-y'),
+                   y=alt.Y(y, type=t[y]),
+                   tooltip=tooltip,
+                   color=alt.value(PALETTE["sky"]),
+               )
+               .properties(height=280, **props)
+        )
+    return chart.to_dict()
+
 def area_chart(df: pd.DataFrame, x: str, y: str, title: Optional[str] = None):
-    chart = alt.Chart(df)
-    if title:
-        chart = chart.properties(title=title)
-    chart = (
-        chart.mark_area(opacity=0.5, line={"color": PALETTE["mint"], "width": 2})
-             .encode(
-                 x=alt.X(x, sort=None, axis=alt.Axis(labelAngle=0)),
-                 y=alt.Y(y, stack=None),
-                 tooltip=[x, y],
-             )
-             .properties(height=260)
-    )
-    return st.altair_chart(chart, use_container_width=True)
+    return st.vega_lite_chart(_chart_spec(df, "area", x, y, title), use_container_width=True)
 
 def bar_chart(df: pd.DataFrame, x: str, y: str, title: Optional[str] = None):
-    chart = alt.Chart(df)
-    if title:
-        chart = chart.properties(title=title)
-    chart = (
-        chart.mark_bar(cornerRadiusTopLeft=4, cornerRadiusTopRight=4)
-             .encode(
-                 x=alt.X(x, sort='-y'),
-                 y=alt.Y(y),
-                 tooltip=[x, y],
-                 color=alt.value(PALETTE["sky"]),
-             )
-             .properties(height=280)
-    )
-    return st.altair_chart(chart, use_container_width=True)
+    return st.vega_lite_chart(_chart_spec(df, "bar", x, y, title), use_container_width=True)
 
 # ── Money formatting ─────────────────────────────────────────────────────────
 def fmt_money(value: Optional[Number], currency: str, decimals: int = 2) -> str:
@@ -187,5 +226,29 @@ def fmt_money(value: Optional[Number], currency: str, decimals: int = 2) -> str:
         v = float(value)
     except Exception:
         return f"{value} {currency}"
-    fmt = f"{{:,.{decimals}f}}"
-    return f"{fmt.format(v)} {currency}"
+    if v != v:  # NaN은 키로 재사용되지 않으므로 캐시를 거치지 않음
+        return f"nan {currency}"
+    return _fmt_money_cached(v, currency, decimals)
+
+
+@lru_cache(maxsize=8192)
+def _fmt_money_cached(v: float, currency: str, decimals: int) -> str:
+    """
+    같은 금액이 헤더/캡션/표에 반복 렌더되므로 (값, 통화, 자릿수)별 결과를 메모이즈.
+    프로세스(서버) 단위 캐시, 최대 8192개로 제한 (LRU).
+    """
+    return f"{_money_fmt(decimals)(v)} {currency}"
+
+
+@lru_cache(maxsize=8)
+def _money_fmt(decimals: int):
+    """자릿수별 바운드 str.format (포맷 템플릿을 호출마다 다시 만들지 않음)."""
+    return f"{{:,.{decimals}f}}".format
+
+
+def fmt_money_series(values: pd.Series, currency: str, decimals: int = 2) -> pd.Series:
+    """
+    Column-wise fmt_money for a single currency (NaN → 0).
+    float 캐스팅은 한 번에, 포맷은 바운드 str.format 하나로 → 행마다 lambda/분기 없음.
+    """
+    return values.fillna(0.0).astype(float).map(f"{{:,.{decimals}f}} {currency}".format)
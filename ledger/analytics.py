@@ -3,10 +3,11 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple, Union
 from math import erf, sqrt
 import math
 
+import numpy as np
 import pandas as pd
 from zoneinfo import ZoneInfo
 import sqlite3
@@ -14,76 +15,71 @@ import sqlite3
 LOCAL_TZ = ZoneInfo("America/Chicago")
 
 
-# ---------- DB → DataFrame ----------
+# ---------- SQL aggregation (환산/집계는 DB에서, pandas엔 집계 결과만) ----------
 
-def _fetch_txns(conn: sqlite3.Connection, start_iso: Optional[str], end_iso: Optional[str]) -> pd.DataFrame:
-    q = """
-    SELECT date_utc, amount, currency, category, direction
-    FROM transactions
-    WHERE is_deleted=0
+# debit 금액 → 기준통화 (KRW↔USD only for MVP). 환율은 거래일(UTC) 이전 최신값, 없거나 미지원 통화쌍이면 NULL.
+# params: :base
+_AMOUNT_BASE_SQL = """CASE
+                   WHEN t.currency = :base THEN t.amount
+                   WHEN :base = 'KRW' AND t.currency = 'USD' THEN t.amount * (
+                     SELECT rate FROM fx_cache
+                     WHERE base='USD' AND quote='KRW' AND date_utc <= substr(t.date_utc, 1, 10)
+                     ORDER BY date_utc DESC LIMIT 1)
+                   WHEN :base = 'USD' AND t.currency = 'KRW' THEN t.amount / (
+                     SELECT rate FROM fx_cache
+                     WHERE base='USD' AND quote='KRW' AND date_utc <= substr(t.date_utc, 1, 10)
+                     ORDER BY date_utc DESC LIMIT 1)
+                 END"""
+
+
+def read_frame(conn: sqlite3.Connection, q: str, params=()) -> pd.DataFrame:
     """
-    args: List[str] = []
-    if start_iso:
-        q += " AND date_utc >= ?"
-        args.append(start_iso)
-    if end_iso:
-        q += " AND date_utc <= ?"
-        args.append(end_iso)
-    df = pd.read_sql_query(q, conn, params=args)
-    if df.empty:
-        return df
-    # make tz-aware (UTC)
-    df["date_utc"] = pd.to_datetime(df["date_utc"], utc=True)
-    # local month label
-    df["date_local"] = df["date_utc"].dt.tz_convert(LOCAL_TZ)
-    df["month"] = df["date_local"].dt.to_period("M").astype(str)  # 'YYYY-MM'
-    return df
-
-
-# ---------- FX helpers (USD↔KRW only for MVP) ----------
-
-def _get_fx_for_date(conn: sqlite3.Connection, base: str, quote: str, date_str: str) -> Optional[float]:
+    SELECT 결과 → DataFrame (fetchall + from_records; read_sql_query의 래핑/행 반복 경로 생략).
+    커서 단위로 row_factory=None → 튜플로 받음 (공유 conn의 Row 설정은 건드리지 않음).
     """
-    Return rate for given date (YYYY-MM-DD). If not found, fallback to the latest <= date.
-    Stored series is daily; date_str derived from transaction UTC date.
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(q, params)
+    cols = [d[0] for d in cur.description]
+    return pd.DataFrame.from_records(cur.fetchall(), columns=cols)
+
+
+def _debit_totals(conn: sqlite3.Connection, base: str,
+                  start_iso: Optional[str], end_iso: Optional[str],
+                  keys: Sequence[str] = (), *,
+                  category: Optional[str] = None,
+                  join_accounts: bool = False) -> pd.DataFrame:
     """
-    row = conn.execute(
-        """SELECT rate FROM fx_cache
-           WHERE base=? AND quote=? AND date_utc=?
-           ORDER BY date_utc DESC LIMIT 1""",
-        (base, quote, date_str)
-    ).fetchone()
-    if row:
-        return float(row["rate"])
-    # fallback to latest prior
-    row = conn.execute(
-        """SELECT rate FROM fx_cache
-           WHERE base=? AND quote=? AND date_utc<=?
-           ORDER BY date_utc DESC LIMIT 1""",
-        (base, quote, date_str)
-    ).fetchone()
-    return float(row["rate"]) if row else None
-
-
-def _convert_amount(conn: sqlite3.Connection, amt: float, cur: str, base: str, date_utc: pd.Timestamp) -> Optional[float]:
+    debit 합계(기준통화)를 keys별로 SQL GROUP BY 한 번에 — 거래 행은 pandas로 가져오지 않는다.
+    keys: "expr AS name" (t=transactions, a=accounts[join_accounts]), 예: "local_ym(t.date_utc) AS month"
+    (local_ym은 get_conn에서 등록 — ledger/sqlfuncs.py)
+    환산 불가(NULL) 거래는 제외. Columns: <key names>..., amount_base, count
     """
-    Convert amt in 'cur' to 'base' using fx_cache (USD->KRW). Supports KRW↔USD.
+    where = ["t.is_deleted=0", "t.direction='debit'"]
+    params: Dict[str, object] = {"base": base.upper()}
+    if start_iso:
+        where.append("t.date_utc >= :start")
+        params["start"] = start_iso
+    if end_iso:
+        where.append("t.date_utc <= :end")
+        params["end"] = end_iso
+    if category:
+        where.append("t.category = :category")
+        params["category"] = category
+    names = [k.rsplit(" AS ", 1)[1] for k in keys]
+    q = f"""
+    SELECT {"".join(n + ", " for n in names)}SUM(amount_base) AS amount_base, COUNT(amount_base) AS count
+    FROM (
+      SELECT {"".join(k + ", " for k in keys)}{_AMOUNT_BASE_SQL} AS amount_base
+      FROM transactions t
+      {"JOIN accounts a ON a.id = t.account_id" if join_accounts else ""}
+      WHERE {" AND ".join(where)}
+    )
+    WHERE amount_base IS NOT NULL
+    {"GROUP BY " + ", ".join(names) if names else ""}
     """
-    cur = cur.upper()
-    base = base.upper()
-    if cur == base:
-        return float(amt)
-
-    d = date_utc.strftime("%Y-%m-%d")
-    if base == "KRW" and cur == "USD":
-        r = _get_fx_for_date(conn, "USD", "KRW", d)
-        return None if r is None else float(amt) * r
-    if base == "USD" and cur == "KRW":
-        r = _get_fx_for_date(conn, "USD", "KRW", d)
-        return None if r is None else float(amt) / r
-
-    # unknown currency pair; skip
-    return None
+    df = read_frame(conn, q, params)
+    return df.astype({"amount_base": float, "count": int})  # 빈 결과도 숫자 dtype 유지
 
 
 # ---------- Public API ----------
@@ -109,31 +105,17 @@ def monthly_category_totals(conn: sqlite3.Connection, base: str,
     """
     Returns {category: [TrendPoint(month, value_in_base), ...]} for direction='debit' (spend).
     """
-    df = _fetch_txns(conn, start_iso, end_iso)
-    if df.empty:
+    grp = _debit_totals(conn, base, start_iso, end_iso,
+                        ["local_ym(t.date_utc) AS month", "t.category AS category"])
+    if grp.empty:
         return {}
-
-    # spend only (debit)
-    df = df[df["direction"] == "debit"].copy()
-
-    # convert to base currency
-    conv_vals: List[Optional[float]] = []
-    for i, r in df.iterrows():
-        val = _convert_amount(conn, float(r["amount"]), str(r["currency"]), base, r["date_utc"])
-        conv_vals.append(val)
-    df["amount_base"] = conv_vals
-    df = df.dropna(subset=["amount_base"])
-
-    # aggregate by month/category
-    grp = df.groupby(["month", "category"], as_index=False)["amount_base"].sum()
-    # ensure sorted by month
     grp = grp.sort_values(["category", "month"])
 
-    # pack as dict
+    # pack as dict (정렬된 컬럼을 한 번만 순회; 카테고리별 sub-DataFrame 생성 없음)
     out: Dict[str, List[TrendPoint]] = {}
-    for cat, g in grp.groupby("category"):
-        points = [TrendPoint(month=m, value=float(v)) for m, v in zip(g["month"], g["amount_base"])]
-        out[str(cat)] = points
+    for cat, m, v in zip(grp["category"].astype(str).tolist(), grp["month"].tolist(),
+                         grp["amount_base"].astype(float).tolist()):
+        out.setdefault(cat, []).append(TrendPoint(month=m, value=v))
     return out
 
 
@@ -149,51 +131,32 @@ def _mom_pct(values: List[float]) -> Optional[float]:
     return (curr - prev) / prev * 100.0
 
 
-def theil_sen_slope(values: List[float]) -> Optional[float]:
+def _pair_diffs(values: Union[Sequence[float], pd.Series]) -> Tuple[int, np.ndarray, np.ndarray]:
     """
-    Median of pairwise slopes (t is 0..n-1 months). Returns unit per month.
+    NaN 제외 후 모든 (j>i) 쌍의 (y[j]-y[i], j-i)를 triu 인덱스로 한 번에 (파이썬 이중 루프 X).
+    Theil–Sen / Mann–Kendall이 같은 쌍 차분을 공유 → trend_summary는 한 번만 계산.
     """
-    n = len(values)
-    if n < 2:
-        return None
-    slopes: List[float] = []
-    for i in range(n - 1):
-        for j in range(i + 1, n):
-            if (j - i) != 0:
-                slopes.append((values[j] - values[i]) / (j - i))
-    if not slopes:
-        return None
-    slopes.sort()
-    mid = len(slopes) // 2
-    if len(slopes) % 2 == 1:
-        return slopes[mid]
-    else:
-        return 0.5 * (slopes[mid - 1] + slopes[mid])
+    v = np.asarray(values, dtype=np.float64)
+    v = v[~np.isnan(v)]
+    i, j = np.triu_indices(len(v), k=1)
+    return len(v), v[j] - v[i], (j - i)
 
 
-def mann_kendall(values: List[float]) -> Tuple[Optional[float], Optional[float]]:
-    """
-    Returns (tau, pvalue). Simple MK test with normal approximation (ties ignored for MVP).
-    """
-    n = len(values)
-    if n < 6:  # require at least 6 months, per our UX rule
+def _theil_sen(dv: np.ndarray, dt: np.ndarray) -> Optional[float]:
+    return float(np.median(dv / dt)) if len(dv) else None
+
+
+def _mann_kendall(n: int, dv: np.ndarray, min_n: int = 3) -> Tuple[Optional[float], Optional[float]]:
+    if n < max(min_n, 2):
         return None, None
 
-    S = 0
-    for i in range(n - 1):
-        for j in range(i + 1, n):
-            diff = values[j] - values[i]
-            S += 1 if diff > 0 else (-1 if diff < 0 else 0)
+    S = int(np.sign(dv).sum())
 
     # Kendall's tau
-    denom = n * (n - 1) / 2
-    tau = S / denom if denom else 0.0
+    tau = S / (n * (n - 1) / 2)
 
     # Var(S) under H0 (no ties version)
     varS = n * (n - 1) * (2 * n + 5) / 18
-    if varS <= 0:
-        return tau, None
-
     if S > 0:
         z = (S - 1) / math.sqrt(varS)
     elif S < 0:
@@ -201,10 +164,33 @@ def mann_kendall(values: List[float]) -> Tuple[Optional[float], Optional[float]]
     else:
         z = 0.0
 
-    # two-sided p-value using erf
-    # Phi(z) = 0.5 * (1 + erf(z / sqrt(2)))
-    p = 2 * (1 - 0.5 * (1 + math.erf(abs(z) / math.sqrt(2))))
-    return tau, p
+    # two-sided p-value: 2 * (1 - Phi(|z|))
+    p = 2.0 * (1.0 - _phi(abs(z)))
+    return float(tau), float(min(max(p, 0.0), 1.0))
+
+
+def theil_sen_slope(values: Union[Sequence[float], pd.Series]) -> Optional[float]:
+    """
+    Theil–Sen: 모든 (j>i) 쌍의 (y[j]-y[i])/(j-i) 중앙값 (t = 0..n-1 months). Returns unit per month.
+    values: list 또는 시간순 Series (NaN은 제외). 길이 n<2이면 None.
+    """
+    _, dv, dt = _pair_diffs(values)
+    return _theil_sen(dv, dt)
+
+
+def _phi(z: float) -> float:
+    # 표준정규 CDF
+    return 0.5 * (1.0 + erf(z / sqrt(2.0)))
+
+
+def mann_kendall(values: Union[Sequence[float], pd.Series], min_n: int = 3) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Returns (tau, pvalue). Simple MK test with normal approximation (ties ignored for MVP).
+    values: list 또는 시간순 Series (NaN은 제외). 길이 n<min_n이면 (None, None).
+    S = Σ_{j>i} sign(y[j]-y[i])
+    """
+    n, dv, _ = _pair_diffs(values)
+    return _mann_kendall(n, dv, min_n)
 
 
 def summarize_trends(cat_points: Dict[str, List[TrendPoint]]) -> List[TrendSummary]:
@@ -212,8 +198,9 @@ def summarize_trends(cat_points: Dict[str, List[TrendPoint]]) -> List[TrendSumma
     for cat, points in cat_points.items():
         values = [p.value for p in points]
         mom = _mom_pct(values)
-        ts = theil_sen_slope(values)
-        tau, p = mann_kendall(values)
+        n, dv, dt = _pair_diffs(values)
+        ts = _theil_sen(dv, dt)
+        tau, p = _mann_kendall(n, dv, min_n=6)  # require at least 6 months, per our UX rule
         out.append(TrendSummary(category=cat, months=points, mom_pct=mom,
                                 theil_sen_per_month=ts, mk_tau=tau, mk_pvalue=p))
     # sort by latest month value desc
@@ -235,41 +222,9 @@ def mtd_spend(conn: sqlite3.Connection, base: str, now_utc: Optional[datetime] =
     start_iso = month_start_utc.strftime("%Y-%m-%dT%H:%M:%SZ")
     end_iso = now_utc.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-    df = _fetch_txns(conn, start_iso, end_iso)
-    if df.empty:
-        return 0.0
-
-    df = df[df["direction"] == "debit"].copy()
-
-    # 환산
-    conv_vals = []
-    for _, r in df.iterrows():
-        v = _convert_amount(conn, float(r["amount"]), str(r["currency"]), base, r["date_utc"])
-        if v is not None:
-            conv_vals.append(v)
-    return float(sum(conv_vals)) if conv_vals else 0.0
-
-def _fetch_txns_joined(conn: sqlite3.Connection, start_iso: Optional[str], end_iso: Optional[str]) -> pd.DataFrame:
-    q = """
-    SELECT t.date_utc, t.amount, t.currency, t.category, t.direction,
-           a.institution, a.name AS account_name
-    FROM transactions t
-    JOIN accounts a ON a.id = t.account_id
-    WHERE t.is_deleted=0
-    """
-    args = []
-    if start_iso:
-        q += " AND t.date_utc >= ?"
-        args.append(start_iso)
-    if end_iso:
-        q += " AND t.date_utc <= ?"
-        args.append(end_iso)
-
-    df = pd.read_sql_query(q, conn, params=args)
-    if df.empty:
-        return df
-    df["date_utc"] = pd.to_datetime(df["date_utc"], utc=True)
-    return df
+    # 환산 불가 거래는 제외, 거래가 없으면 0
+    total = _debit_totals(conn, base, start_iso, end_iso)["amount_base"].iloc[0]
+    return float(total) if pd.notna(total) else 0.0
 
 def spend_by_institution(conn: sqlite3.Connection, base: str,
                          start_iso: Optional[str], end_iso: Optional[str]) -> pd.DataFrame:
@@ -277,35 +232,15 @@ def spend_by_institution(conn: sqlite3.Connection, base: str,
     기관(institution)별 지출 합계/건수 (direction='debit'만), 기준 통화로 환산하여 반환.
     Columns: institution, amount_base, count
     """
-    df = _fetch_txns_joined(conn, start_iso, end_iso)
-    if df.empty:
-        return df
-
-    df = df[df["direction"]=="debit"].copy()
-    conv = []
-    for _, r in df.iterrows():
-        v = _convert_amount(conn, float(r["amount"]), str(r["currency"]), base, r["date_utc"])
-        if v is not None:
-            conv.append(v)
-        else:
-            conv.append(float("nan"))
-    df["amount_base"] = conv
-    df = df.dropna(subset=["amount_base"])
-    grp = df.groupby(df["institution"].fillna("Unknown"), as_index=False).agg(
-        amount_base=("amount_base","sum"), count=("amount_base","count")
-    )
-    grp = grp.sort_values("amount_base", ascending=False)
-    return grp
+    grp = _debit_totals(conn, base, start_iso, end_iso,
+                        ["coalesce(a.institution, 'Unknown') AS institution"], join_accounts=True)
+    return grp.sort_values("amount_base", ascending=False)
 
-def month_actuals_by_category(conn: sqlite3.Connection, base: str, year: int, month: int) -> Dict[str, float]:
+def _local_month_bounds(year: int, month: int) -> Tuple[str, str]:
     """
-    해당 월(현지 tz 기준)의 카테고리별 지출합(=debit 합계)을 기준통화로 환산해서 반환.
+    현지 tz 기준 해당 월의 [시작, 다음 달 시작]을 UTC ISO 문자열로 반환.
     ZoneInfo(예: America/Chicago) 사용: localize 불가 → tz-aware로 직접 생성.
     """
-    from datetime import datetime, timezone
-
-    LOCAL_TZ = ZoneInfo("America/Chicago")  # 환경에 맞추어 필요 시 설정
-    # tz-aware 시작/종료
     start_local = datetime(year=year, month=month, day=1, tzinfo=LOCAL_TZ)
     if month == 12:
         end_local = datetime(year=year + 1, month=1, day=1, tzinfo=LOCAL_TZ)
@@ -314,70 +249,60 @@ def month_actuals_by_category(conn: sqlite3.Connection, base: str, year: int, mo
 
     start_iso = start_local.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     end_iso = end_local.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return start_iso, end_iso
+
+# 월 실적 집계 CTE (debit 합계 → 기준통화; 환율은 거래일 이전 최신값, 없으면 그 거래는 제외)
+# month_actuals_by_category / budget_vs_actual 공용. params: :base, :start, :end
+_MONTH_ACTUALS_CTE = f"""
+    a AS (
+      SELECT t.category,
+             SUM({_AMOUNT_BASE_SQL}) AS actual
+      FROM transactions t
+      WHERE t.is_deleted=0 AND t.direction='debit'
+        AND t.date_utc >= :start AND t.date_utc <= :end
+      GROUP BY t.category
+      HAVING actual IS NOT NULL
+    )"""
 
-    # 기존 내부 헬퍼를 사용한다고 가정 (_fetch_txns, _convert_amount)
-    df = _fetch_txns(conn, start_iso, end_iso)
-    if df.empty:
-        return {}
-
-    df = df[df["direction"] == "debit"].copy()
-    conv = []
-    for _, r in df.iterrows():
-        v = _convert_amount(conn, float(r["amount"]), str(r["currency"]), base, r["date_utc"])
-        conv.append(v)
-    df["amount_base"] = conv
-    df = df.dropna(subset=["amount_base"])
-    grp = df.groupby("category", as_index=False)["amount_base"].sum()
-    return {str(r["category"]): float(r["amount_base"]) for _, r in grp.iterrows()}
-
-def _phi(z: float) -> float:
-    # 표준정규 CDF
-    return 0.5 * (1.0 + erf(z / sqrt(2.0)))
-
-def mann_kendall(y: pd.Series) -> Optional[Dict[str, float]]:
+def month_actuals_by_category(conn: sqlite3.Connection, base: str, year: int, month: int) -> Dict[str, float]:
     """
-    Mann–Kendall trend test (ties 무시한 간단 버전).
-    y: 시계열 값(시간 순 정렬). 길이 n<3이면 None.
-    반환: {"tau": τ, "z": z, "p": p_two_sided}
+    해당 월(현지 tz 기준)의 카테고리별 지출합(=debit 합계)을 기준통화로 환산해서 반환.
+    SQL GROUP BY 한 번 (행마다 환율 조회/iterrows 없음).
     """
-    y = y.dropna()
-    n = len(y)
-    if n < 3:
-        return None
-    vals = y.values
-    # S = sum_{j>i} sign(yj - yi)
-    S = 0
-    for i in range(n - 1):
-        diff = vals[i + 1:] - vals[i]
-        S += (diff > 0).sum() - (diff < 0).sum()
-    # Kendall's tau
-    denom = n * (n - 1) / 2.0
-    tau = S / denom if denom else 0.0
-    # Var(S) (ties 무시)
-    varS = (n * (n - 1) * (2 * n + 5)) / 18.0
-    if varS == 0:
-        return {"tau": tau, "z": 0.0, "p": 1.0}
-    z = (S - 1) / sqrt(varS) if S > 0 else (S + 1) / sqrt(varS) if S < 0 else 0.0
-    p = 2.0 * (1.0 - _phi(abs(z)))
-    return {"tau": float(tau), "z": float(z), "p": float(max(min(p, 1.0), 0.0))}
+    start_iso, end_iso = _local_month_bounds(year, month)
+    rows = conn.execute(f"WITH {_MONTH_ACTUALS_CTE} SELECT category, actual FROM a",
+                        {"base": base.upper(), "start": start_iso, "end": end_iso}).fetchall()
+    return {str(r["category"]): float(r["actual"]) for r in rows}
 
-def theil_sen_slope(y: pd.Series) -> Optional[float]:
+def budget_vs_actual(conn: sqlite3.Connection, base: str, year: int, month: int) -> pd.DataFrame:
     """
-    Theil–Sen: 모든 (j>i) 쌍의 (y[j]-y[i])/(j-i) 중앙값.
-    y: 시계열 값(시간 순 정렬). 길이 n<2이면 None.
-    반환: 월당 증가액(기준통화 단위).
+    해당 월의 카테고리별 (실적, 예산)을 SQL 한 번으로 계산해 반환.
+    - 실적: debit 합계를 기준통화로 환산 (환율은 거래일 이전 최신값, 없으면 제외)
+    - 예산: 기준통화 예산 중 해당 월 지정 우선 → 없으면 공통(month IS NULL)
+    Columns: category, actual, budget  (category 오름차순)
     """
-    y = y.dropna()
-    n = len(y)
-    if n < 2:
-        return None
-    vals = y.values
-    slopes = []
-    for i in range(n - 1):
-        dy = vals[i + 1:] - vals[i]
-        dx = (pd.Series(range(i + 1, n)).values - i).astype(float)  # 월 간격: 1,2,...
-        slopes.extend((dy / dx).tolist())
-    return float(pd.Series(slopes).median()) if slopes else None
+    base = base.upper()
+    start_iso, end_iso = _local_month_bounds(year, month)
+    q = f"""
+    WITH {_MONTH_ACTUALS_CTE},
+    b AS (
+      SELECT category,
+             COALESCE(MAX(CASE WHEN month = :ym THEN amount END),
+                      MAX(CASE WHEN month IS NULL THEN amount END)) AS budget
+      FROM budgets
+      WHERE currency = :base AND (month = :ym OR month IS NULL)
+      GROUP BY category
+    ),
+    c AS (SELECT category FROM a UNION SELECT category FROM b)
+    SELECT c.category, COALESCE(a.actual, 0.0) AS actual, COALESCE(b.budget, 0.0) AS budget
+    FROM c
+    LEFT JOIN a ON a.category = c.category
+    LEFT JOIN b ON b.category = c.category
+    ORDER BY c.category
+    """
+    params = {"base": base, "start": start_iso, "end": end_iso, "ym": f"{year:04d}-{month:02d}"}
+    df = read_frame(conn, q, params)
+    return df.astype({"actual": float, "budget": float})  # 빈 결과도 숫자 dtype 유지
 
 def monthly_spend_series(conn, base: str = "KRW", months: int = 24, category: Optional[str] = None) -> pd.Series:
     """
@@ -397,48 +322,31 @@ def monthly_spend_series(conn, base: str = "KRW", months: int = 24, category: Op
     end_period = now_ts.to_period("M")
     full_idx = pd.period_range(start=start_period, end=end_period, freq="M").astype(str)
 
-    df = _fetch_txns(conn, start_iso, end_iso)
-    if df.empty:
-        return pd.Series([0.0] * len(full_idx), index=full_idx)
-
-    # 지출만, 카테고리 필터
-    df = df[df["direction"] == "debit"].copy()
-    if category:
-        df = df[df["category"] == category]
-    if df.empty:
-        return pd.Series([0.0] * len(full_idx), index=full_idx)
-
-    # 기준통화 환산
-    conv = []
-    for _, r in df.iterrows():
-        v = _convert_amount(conn, float(r["amount"]), str(r["currency"]), base, r["date_utc"])
-        conv.append(v)
-    df["amount_base"] = conv
-    df = df.dropna(subset=["amount_base"]).copy()
-    if df.empty:
-        return pd.Series([0.0] * len(full_idx), index=full_idx)
-
-    # 월(YYYY-MM)로 집계
-    df["ym"] = pd.to_datetime(df["date_utc"]).dt.to_period("M").astype(str)
-    s = df.groupby("ym")["amount_base"].sum().sort_index()
+    # 지출만(카테고리 필터 포함), UTC 월(YYYY-MM)로 SQL에서 집계
+    grp = _debit_totals(conn, base, start_iso, end_iso,
+                        ["substr(t.date_utc, 1, 7) AS ym"], category=category)
+    s = pd.Series(grp["amount_base"].to_numpy(dtype=float), index=grp["ym"].astype(str)).sort_index()
 
     # 빈 달 0 채우기
     s = s.reindex(full_idx, fill_value=0.0)
     return s
 
-def trend_summary(conn, base: str, months: int, category: Optional[str] = None) -> Dict[str, Optional[float]]:
+def trend_summary(conn, base: str, months: int, category: Optional[str] = None,
+                  series: Optional[pd.Series] = None) -> Dict[str, Optional[float]]:
     """
     월별 시계열 → Mann–Kendall(τ,p) + Theil–Sen(slope) + 최근/평균.
     slope 단위: 기준통화/월.
+    series: 같은 인자로 이미 구한 monthly_spend_series 결과 (주면 재조회/재환산 생략).
     """
-    s = monthly_spend_series(conn, base=base, months=months, category=category)
-    mk = mann_kendall(s)
-    slope = theil_sen_slope(s)
+    s = series if series is not None else monthly_spend_series(conn, base=base, months=months, category=category)
+    n, dv, dt = _pair_diffs(s)  # 쌍 차분 한 번 → MK/Theil–Sen 공유
+    tau, p = _mann_kendall(n, dv)
+    slope = _theil_sen(dv, dt)
     res = {
         "last": float(s.iloc[-1]) if len(s) else None,
         "mean": float(s.mean()) if len(s) else None,
-        "tau": mk["tau"] if mk else None,
-        "p": mk["p"] if mk else None,
+        "tau": tau,
+        "p": p,
         "slope": slope
     }
     return res
\ No newline at end of file
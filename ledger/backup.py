@@ -1,7 +1,14 @@
 from __future__ import annotations
 from pathlib import Path
 from datetime import datetime
-import shutil
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+
+_counter = itertools.count()
+_log = logging.getLogger(__name__)
 
 def _backups_dir(path: str | Path) -> Path:
     p = Path(path)
@@ -15,39 +22,46 @@ def create_backup(
     keep_last: int | None = 10,
 ) -> Path:
     """
-    Copy db file into backups_dir with timestamped name.
+    Copy db into backups_dir with timestamped name (online sqlite3 backup API,
+    so concurrent readers/writers are only blocked briefly per page batch).
     If keep_last is not None, prune old backups keeping the most recent N.
     """
     backups = _backups_dir(backups_dir)
-    # include seconds + microseconds to avoid collisions
+    # microseconds + pid + per-process counter → unique without an exists() check
+    # (counter는 0-padding: 같은 µs 안에서도 파일명 정렬 = 생성 순서)
     ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    dest = backups / f"{prefix}_{ts}.sqlite"
-
-    # last resort: ensure uniqueness if same ts somehow appears
-    i = 1
-    while dest.exists():
-        dest = backups / f"{prefix}_{ts}_{i}.sqlite"
-        i += 1
+    dest = backups / f"{prefix}_{ts}_{os.getpid()}_{next(_counter):06d}.sqlite"
 
-    shutil.copy2(str(db_path), str(dest))
+    # 읽기 전용 URI → db_path가 없으면 빈 DB를 만들지 않고 OperationalError (copy2처럼 실패)
+    src = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    dst = sqlite3.connect(str(dest))
+    try:
+        src.backup(dst, pages=256, sleep=0.0)
+    finally:
+        dst.close()
+        src.close()
 
     if keep_last is not None:
         prune_backups(backups, prefix, keep_last)
 
     return dest
 
+def _backup_names(backups: Path, prefix: str, day: str = "") -> list[str]:
+    """
+    {prefix}_{day}*.sqlite 파일명, 최신순. 이름이 YYYYMMDD_HHMMSS_ffffff로 시작해
+    파일명 정렬 = 생성 시각 정렬 → stat() 호출 없이 listdir 한 번.
+    """
+    head = f"{prefix}_{day}"
+    return sorted((f for f in os.listdir(backups) if f.startswith(head) and f.endswith(".sqlite")),
+                  reverse=True)
+
 def list_backups(
     backups_dir: str | Path = "backups",
     prefix: str = "ledger",
     limit: int = 10,
 ):
     backups = _backups_dir(backups_dir)
-    files = sorted(
-        backups.glob(f"{prefix}_*.sqlite"),
-        key=lambda p: p.stat().st_mtime,
-        reverse=True,
-    )
-    return files[:limit]
+    return [backups / f for f in _backup_names(backups, prefix)[:limit]]  # Path는 반환할 N개만
 
 def prune_backups(
     backups_dir: str | Path,
@@ -55,15 +69,10 @@ def prune_backups(
     keep_last: int = 10,
 ) -> int:
     backups = _backups_dir(backups_dir)
-    files = sorted(
-        backups.glob(f"{prefix}_*.sqlite"),
-        key=lambda p: p.stat().st_mtime,
-        reverse=True,
-    )
     deleted = 0
-    for f in files[keep_last:]:
+    for f in _backup_names(backups, prefix)[keep_last:]:
         try:
-            f.unlink()
+            os.unlink(os.path.join(backups, f))
             deleted += 1
         except Exception:
             pass
@@ -81,16 +90,84 @@ def ensure_daily_backup(
     Also prunes to keep the most recent `keep_last` backups when creating a new one.
     """
     backups = _backups_dir(backups_dir)
+    if _today_backup_done(backups, prefix):  # 오늘 마커 + 그 백업 파일 stat → 끝 (디렉터리 스캔 X)
+        return False
     today = datetime.now().strftime("%Y%m%d")
-    # seconds/microseconds are part of filenames; this glob matches today's files
-    existing = list(backups.glob(f"{prefix}_{today}_*.sqlite"))
-    if existing:
+    # cold path — seconds/microseconds are part of filenames; this prefix matches today's files
+    names = _backup_names(backups, prefix, f"{today}_")
+    if names:
+        _touch_marker(backups, prefix, names[0])
         return False
     # create new daily backup and prune according to keep_last
-    create_backup(
+    dest = create_backup(
         db_path=db_path,
         backups_dir=backups_dir,
         prefix=prefix,
         keep_last=keep_last,
     )
+    _touch_marker(backups, prefix, dest.name)
     return True
+
+# ---------- Background daily backup ----------
+_inflight_lock = threading.Lock()
+_inflight: set[str] = set()
+
+def _marker_path(backups: Path, prefix: str) -> Path:
+    return backups / f".last_{prefix}_{datetime.now().strftime('%Y%m%d')}"
+
+def _today_backup_done(backups: Path, prefix: str) -> bool:
+    """오늘 마커가 가리키는 백업 파일이 아직 있으면 True (삭제/prune됐으면 cold path로)."""
+    try:
+        name = _marker_path(backups, prefix).read_text().strip()
+    except OSError:
+        return False
+    return bool(name) and (backups / name).exists()
+
+def _touch_marker(backups: Path, prefix: str, backup_name: str) -> None:
+    """오늘 마커에 백업 파일명 기록 + 이 prefix의 지난 마커 정리 (다른 prefix 마커는 건드리지 않음)."""
+    marker = _marker_path(backups, prefix)
+    head = f".last_{prefix}_"
+    for old in backups.glob(f"{head}*"):
+        day = old.name[len(head):]
+        if old != marker and len(day) == 8 and day.isdigit():  # "t"가 "t_x" 마커를 지우지 않도록
+            try:
+                old.unlink()
+            except OSError:
+                pass
+    marker.write_text(backup_name)
+
+def ensure_daily_backup_async(
+    db_path: str | Path,
+    backups_dir: str | Path = "backups",
+    prefix: str = "ledger",
+    keep_last: int | None = 10,
+) -> threading.Thread | None:
+    """
+    Non-blocking ensure_daily_backup for UI reruns.
+    Fast path reads backups/.last_{prefix}_YYYYMMDD and stats the backup it names;
+    otherwise the backup runs in a daemon thread and writes the marker on success.
+    Returns the started thread, or None if today's backup is done or in progress.
+    """
+    backups = _backups_dir(backups_dir)
+    if _today_backup_done(backups, prefix):
+        return None
+
+    key = f"{backups.resolve()}|{prefix}"
+    with _inflight_lock:
+        if key in _inflight:
+            return None
+        _inflight.add(key)
+
+    def _run() -> None:
+        try:
+            ensure_daily_backup(db_path, backups_dir=backups, prefix=prefix, keep_last=keep_last)
+        except Exception:
+            # 마커 미생성 → 다음 rerun에서 재시도. 계속 실패하면 로그로 보이게
+            _log.exception("daily backup of %s failed", db_path)
+        finally:
+            with _inflight_lock:
+                _inflight.discard(key)
+
+    t = threading.Thread(target=_run, name="daily-backup", daemon=True)
+    t.start()
+    return t
@@ -1,8 +1,11 @@
 from pathlib import Path
+import json
 import sqlite3
 from datetime import datetime, timezone
 from typing import Optional, List, Iterable, Tuple, Dict, Any
 
+from .sqlfuncs import register_functions
+
 SCHEMA = """
 PRAGMA foreign_keys = ON;
 
@@ -38,6 +41,13 @@ CREATE TABLE IF NOT EXISTS transactions (
 CREATE INDEX IF NOT EXISTS idx_txn_date    ON transactions(date_utc);
 CREATE INDEX IF NOT EXISTS idx_txn_account ON transactions(account_id);
 CREATE INDEX IF NOT EXISTS idx_txn_cat     ON transactions(category);
+-- 중복 감지(find_duplicate_candidates): 계정 고정 + 날짜 범위 탐색 + 금액 비교를 인덱스만으로
+CREATE INDEX IF NOT EXISTS idx_txn_acct_date_amt ON transactions(account_id, date_utc, amount);
+-- 집계/목록의 공통 필터(is_deleted=0 AND date_utc 범위)를 한 번의 범위 탐색으로
+CREATE INDEX IF NOT EXISTS idx_txn_live_date ON transactions(is_deleted, date_utc);
+-- 계정별 잔액(account_balances_native)/기간 조회(get_txns_between): 계정+is_deleted 고정 후 날짜 범위,
+-- direction/amount까지 포함 → SUM(CASE direction ...)이 테이블 행 접근 없는 covering index 탐색
+CREATE INDEX IF NOT EXISTS idx_txn_acct_live_date ON transactions(account_id, is_deleted, date_utc, direction, amount);
 
 CREATE TABLE IF NOT EXISTS fx_cache (
   id                INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -49,6 +59,8 @@ CREATE TABLE IF NOT EXISTS fx_cache (
   retrieved_at_utc  TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%SZ','now')),
   UNIQUE(date_utc, base, quote)
 );
+-- 거래일 이전 최신 환율(base/quote 고정, date_utc <= ? ORDER BY date_utc DESC LIMIT 1) → 인덱스 seek 한 번
+CREATE INDEX IF NOT EXISTS idx_fx_pair_date ON fx_cache(base, quote, date_utc);
 
 CREATE TABLE IF NOT EXISTS settings (
   key        TEXT PRIMARY KEY,
@@ -61,10 +73,20 @@ def get_conn(db_path: str) -> sqlite3.Connection:
         db_path,
         detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
         check_same_thread=False,
+        cached_statements=256,  # 페이지별 조회/집계 SQL이 많음 → prepared statement LRU 여유 있게 (기본 128)
     )
     conn.row_factory = sqlite3.Row
+    register_functions(conn)  # local_ym 등 UDF는 연결당 한 번 (쿼리마다 재등록 X)
     conn.execute("PRAGMA foreign_keys = ON;")
-    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    conn.execute("PRAGMA cache_size = -20000;")    # ~20 MB (음수 = KiB)
+    if db_path != ":memory:":  # 파일 DB에만 의미 있는 설정 (WAL/fsync/mmap/잠금 대기)
+        conn.execute("PRAGMA journal_mode = WAL;")
+        # WAL에서는 NORMAL로도 crash-safe; fsync 횟수를 줄이고 읽기는 mmap/큰 캐시로
+        conn.execute("PRAGMA synchronous = NORMAL;")
+        conn.execute("PRAGMA mmap_size = 268435456;")  # 256 MiB
+        conn.execute("PRAGMA wal_autocheckpoint = 1000;")  # pages; 명시해 두어 WAL 파일 크기 상한을 고정
+        conn.execute("PRAGMA busy_timeout = 5000;")  # 다른 writer가 잡고 있으면 5초까지 대기
     return conn
 
 def init_db(conn: sqlite3.Connection) -> None:
@@ -99,14 +121,78 @@ def add_transaction(conn: sqlite3.Connection, *, date_utc: str, amount: float, c
     conn.commit()
     return cur.lastrowid
 
+def add_transactions_bulk(conn: sqlite3.Connection,
+                          rows: Iterable[Tuple[str, float, str, str, int, str, Optional[str], Optional[str]]]) -> int:
+    """
+    rows: iterable of (date_utc, amount, currency, category, account_id, direction, notes, payee)
+    한 번의 트랜잭션 안에서 executemany로 일괄 INSERT (행마다 commit 하지 않음).
+    """
+    params = [(d, float(amt), cur.upper(), cat, int(aid), direction, notes, payee)
+              for d, amt, cur, cat, aid, direction, notes, payee in rows]
+    with conn:  # BEGIN ... COMMIT (에러 시 ROLLBACK)
+        conn.executemany(
+            """INSERT INTO transactions
+               (date_utc,amount,currency,category,account_id,direction,notes,payee)
+               VALUES (?,?,?,?,?,?,?,?)""",
+            params,
+        )
+    return len(params)
+
 def count_rows(conn: sqlite3.Connection, table: str) -> int:
     row = conn.execute(f"SELECT COUNT(*) AS n FROM {table}").fetchone()
     return int(row["n"])
 
+# ---------- Accounts (Manage 탭) ----------
+def update_accounts_bulk(conn: sqlite3.Connection, updates: Iterable[Dict[str, Any]]) -> int:
+    """
+    updates: [{id, name, institution, currency, type, opening_balance}, ...]
+    여러 계정 수정을 한 트랜잭션의 executemany로 (계정마다 commit/fsync 하지 않음). 반환: 변경된 행 수.
+    institution: 문자열이 아니거나(None/NaN) 공백뿐이면 NULL로 저장.
+    """
+    params = [{**u, "id": int(u["id"]), "currency": str(u["currency"]).upper(),
+               "institution": (u["institution"].strip() or None) if isinstance(u.get("institution"), str) else None,
+               "opening_balance": float(u["opening_balance"])} for u in updates]
+    if not params:
+        return 0
+    with conn:  # BEGIN ... COMMIT (에러 시 ROLLBACK)
+        cur = conn.executemany(
+            """UPDATE accounts
+               SET name=:name, institution=:institution, currency=:currency, type=:type,
+                   opening_balance=:opening_balance,
+                   updated_at_utc=(strftime('%Y-%m-%dT%H:%M:%SZ','now'))
+               WHERE id=:id""",
+            params,
+        )
+    return cur.rowcount
+
+def delete_accounts(conn: sqlite3.Connection, account_ids: Iterable[int]) -> int:
+    """계정 일괄 삭제 (transactions는 ON DELETE CASCADE로 함께 삭제). 반환: 삭제된 행 수."""
+    ids = [int(a) for a in account_ids]
+    if not ids:
+        return 0
+    cur = conn.execute(f"DELETE FROM accounts WHERE id IN ({','.join('?' * len(ids))})", ids)
+    conn.commit()
+    return cur.rowcount
+
+def get_all_account_txn_counts(conn: sqlite3.Connection, include_deleted: bool = False) -> Dict[int, int]:
+    """
+    {account_id: 거래 수} — 계정마다 COUNT를 따로 날리지 않도록 GROUP BY 한 번.
+    기본은 삭제 제외; include_deleted=True면 soft-delete된 행도 셈 (계정 삭제 시 CASCADE로 함께 지워지는 행 수).
+    """
+    where = "" if include_deleted else " WHERE is_deleted=0"
+    rows = conn.execute(
+        f"SELECT account_id, COUNT(*) AS n FROM transactions{where} GROUP BY account_id"
+    ).fetchall()
+    return {int(r["account_id"]): int(r["n"]) for r in rows}
+
 # ---------- Helpers for import/duplicate detection ----------
-def get_accounts(conn: sqlite3.Connection) -> List[sqlite3.Row]:
+def get_accounts(conn: sqlite3.Connection, tuples: bool = False) -> List[Any]:
     # Manage 탭에서 필요로 하는 모든 필드를 포함해서 반환
-    return conn.execute(
+    # tuples=True: 이 커서만 row_factory=None → (id, name, institution, currency, type, opening_balance) 튜플
+    cur = conn.cursor()
+    if tuples:
+        cur.row_factory = None
+    return cur.execute(
         "SELECT id, name, institution, currency, type, opening_balance FROM accounts ORDER BY id"
     ).fetchall()
 
@@ -122,6 +208,34 @@ def get_txns_between(conn: sqlite3.Connection, account_id: int, start_iso: str,
         (int(account_id), start_iso, end_iso)
     ).fetchall()
 
+def find_duplicate_candidates(conn: sqlite3.Connection, account_id: int,
+                              windows: List[Tuple[str, str, float]]) -> List[sqlite3.Row]:
+    """
+    windows[i] = (start_iso, end_iso, amount) → 같은 계정에서 기간 안 + 같은 금액인 기존 거래를
+    (i, payee)로 반환. 입력 전체를 JSON 파라미터 1개로 넘겨 WITH + 단일 SELECT로 처리.
+    """
+    if not windows:
+        return []
+    return conn.execute(
+        """
+        WITH incoming AS (
+          SELECT CAST(key AS INTEGER)        AS i,
+                 json_extract(value, '$[0]') AS start_iso,
+                 json_extract(value, '$[1]') AS end_iso,
+                 json_extract(value, '$[2]') AS amount
+          FROM json_each(?)
+        )
+        SELECT incoming.i AS i, t.payee AS payee
+        FROM incoming
+        CROSS JOIN transactions t  -- incoming을 바깥 루프로 고정 → 행마다 idx_txn_acct_date_amt 범위 탐색
+          ON t.account_id = ?
+         AND t.is_deleted = 0
+         AND t.date_utc BETWEEN incoming.start_iso AND incoming.end_iso
+         AND abs(t.amount - incoming.amount) < 1e-6
+        """,
+        (json.dumps(windows), int(account_id)),
+    ).fetchall()
+
 def get_or_create_account(conn: sqlite3.Connection, *, name: str, currency: str,
                           type: str = "cash", opening_balance: float = 0.0) -> int:
     row = conn.execute(
@@ -171,20 +285,20 @@ def upsert_fx_cache_many(conn: sqlite3.Connection,
                          rows: Iterable[Tuple[str, str, str, float, str]]) -> int:
     """
     rows: iterable of (date_utc(YYYY-MM-DD), base, quote, rate, source)
+    한 번의 트랜잭션 안에서 executemany로 일괄 upsert (prepared statement 1회).
     """
-    n = 0
-    for d, base, quote, rate, src in rows:
-        conn.execute(
+    params = [(d, base.upper(), quote.upper(), float(rate), src)
+              for d, base, quote, rate, src in rows]
+    with conn:  # BEGIN ... COMMIT (에러 시 ROLLBACK)
+        conn.executemany(
             """INSERT INTO fx_cache(date_utc, base, quote, rate, source)
                VALUES(?,?,?,?,?)
                ON CONFLICT(date_utc, base, quote)
                DO UPDATE SET rate=excluded.rate, source=excluded.source,
                              retrieved_at_utc=(strftime('%Y-%m-%dT%H:%M:%SZ','now'))""",
-            (d, base.upper(), quote.upper(), float(rate), src),
+            params,
         )
-        n += 1
-    conn.commit()
-    return n
+    return len(params)
 
 def get_latest_fx(conn: sqlite3.Connection, base: str, quote: str) -> Optional[sqlite3.Row]:
     return conn.execute(
@@ -194,52 +308,56 @@ def get_latest_fx(conn: sqlite3.Connection, base: str, quote: str) -> Optional[s
         (base.upper(), quote.upper()),
     ).fetchone()
 
-def account_balances_native(conn: sqlite3.Connection, as_of_iso: Optional[str] = None):
+def _account_net_rows(conn: sqlite3.Connection, as_of_iso: Optional[str] = None,
+                      fx_date: Optional[str] = None) -> List[tuple]:
     """
-    각 계정의 원화/달러 '자체통화' 잔액을 계산하여 리스트로 반환.
-    잔액 = opening_balance + (credit 합계) - (debit 합계)
+    계정별 (id, name, currency, opening_balance, net_txn[, usd_krw]) 튜플 — 한 번의 GROUP BY.
+    fx_date 지정 시 그 날짜 이전 최신 USD/KRW 환율을 usd_krw 컬럼으로 같은 쿼리에서 함께 (비상관 subselect → 1회 평가).
     """
     date_filter = ""
-    params = []
+    params: Dict[str, Any] = {}
     if as_of_iso:
-        date_filter = "AND t.date_utc <= ?"
-        params.append(as_of_iso)
+        date_filter = "AND t.date_utc <= :as_of"
+        params["as_of"] = as_of_iso
+    fx_col = ""
+    if fx_date:
+        fx_col = """,
+           (SELECT rate FROM fx_cache
+            WHERE base='USD' AND quote='KRW' AND date_utc <= :fx_date
+            ORDER BY date_utc DESC LIMIT 1) AS usd_krw"""
+        params["fx_date"] = fx_date
 
     q = f"""
     SELECT a.id, a.name, a.currency, a.opening_balance,
            COALESCE(SUM(CASE
                 WHEN t.direction='credit' THEN t.amount
                 WHEN t.direction='debit'  THEN -t.amount
-                ELSE 0 END), 0) AS net_txn
+                ELSE 0 END), 0) AS net_txn{fx_col}
     FROM accounts a
     LEFT JOIN transactions t
       ON t.account_id=a.id AND t.is_deleted=0 {date_filter}
     GROUP BY a.id, a.name, a.currency, a.opening_balance
     ORDER BY a.id
     """
-    rows = conn.execute(q, params).fetchall()
-    out = []
-    for r in rows:
-        bal = float(r["opening_balance"]) + float(r["net_txn"])
-        out.append({
-            "account_id": int(r["id"]),
-            "name": str(r["name"]),
-            "currency": str(r["currency"]).upper(),
-            "balance_native": float(bal),
-        })
-    return out
+    cur = conn.cursor()
+    cur.row_factory = None  # 튜플로 받아 언패킹 (Row 객체/키 조회 X)
+    return cur.execute(q, params).fetchall()
+
+def _native_item(r: tuple) -> Dict[str, Any]:
+    aid, name, currency, opening, net_txn = r[:5]
+    return {
+        "account_id": int(aid),
+        "name": str(name),
+        "currency": str(currency).upper(),
+        "balance_native": float(opening) + float(net_txn),
+    }
 
-def _fx_for_date_or_latest(conn: sqlite3.Connection, base: str, quote: str, date_str: str) -> Optional[float]:
+def account_balances_native(conn: sqlite3.Connection, as_of_iso: Optional[str] = None):
     """
-    해당 날짜의 환율이 없으면 '그 이전 최신'을 사용.
+    각 계정의 원화/달러 '자체통화' 잔액을 계산하여 리스트로 반환.
+    잔액 = opening_balance + (credit 합계) - (debit 합계)
     """
-    row = conn.execute(
-        """SELECT rate FROM fx_cache
-           WHERE base=? AND quote=? AND date_utc<=?
-           ORDER BY date_utc DESC LIMIT 1""",
-        (base.upper(), quote.upper(), date_str)
-    ).fetchone()
-    return float(row["rate"]) if row else None
+    return [_native_item(r) for r in _account_net_rows(conn, as_of_iso)]
 
 def balances_in_base(conn: sqlite3.Connection, base: str = "KRW", as_of_iso: Optional[str] = None):
     """
@@ -251,18 +369,20 @@ def balances_in_base(conn: sqlite3.Connection, base: str = "KRW", as_of_iso: Opt
         as_of_iso = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
     as_of_date = as_of_iso[:10]  # YYYY-MM-DD
 
-    items = account_balances_native(conn, as_of_iso)
+    # 잔액 집계와 as_of 환율을 한 쿼리로 (계정마다/별도 환율 SELECT X)
+    rows = _account_net_rows(conn, as_of_iso, fx_date=as_of_date)
+    r = rows[0][5] if rows else None  # usd_krw
     result = []
     total = 0.0
 
-    for it in items:
-        cur = it["currency"].upper()
-        nat = float(it["balance_native"])
+    for row in rows:
+        it = _native_item(row)
+        cur = it["currency"]
+        nat = it["balance_native"]
 
         if cur == base:
             base_val = nat
         elif {cur, base} == {"USD", "KRW"}:
-            r = _fx_for_date_or_latest(conn, "USD", "KRW", as_of_date)
             if r is None:
                 base_val = None
             else:
@@ -279,11 +399,12 @@ def balances_in_base(conn: sqlite3.Connection, base: str = "KRW", as_of_iso: Opt
 
     return {"items": result, "total_base": total}
 
-def list_transactions_joined(conn: sqlite3.Connection, *,
-                             start_iso: Optional[str] = None,
-                             end_iso: Optional[str] = None,
-                             include_deleted: bool = False,
-                             limit: int = 300) -> List[sqlite3.Row]:
+def transactions_joined_sql(*,
+                            start_iso: Optional[str] = None,
+                            end_iso: Optional[str] = None,
+                            include_deleted: bool = False,
+                            limit: int = 300) -> Tuple[str, List[Any]]:
+    """list_transactions_joined의 (SQL, params) — DataFrame으로 바로 읽을 때(analytics.read_frame) 공용."""
     clauses = ["1=1"]
     params: List[Any] = []
     if not include_deleted:
@@ -307,6 +428,15 @@ def list_transactions_joined(conn: sqlite3.Connection, *,
     LIMIT ?
     """
     params.append(int(limit))
+    return q, params
+
+def list_transactions_joined(conn: sqlite3.Connection, *,
+                             start_iso: Optional[str] = None,
+                             end_iso: Optional[str] = None,
+                             include_deleted: bool = False,
+                             limit: int = 300) -> List[sqlite3.Row]:
+    q, params = transactions_joined_sql(start_iso=start_iso, end_iso=end_iso,
+                                        include_deleted=include_deleted, limit=limit)
     return conn.execute(q, params).fetchall()
 
 def update_transaction(conn: sqlite3.Connection, txn_id: int, **fields) -> int:
@@ -336,6 +466,46 @@ def soft_delete_transaction(conn: sqlite3.Connection, txn_id: int, deleted: bool
     conn.commit()
     return cur.rowcount
 
+def _bulk_update(conn: sqlite3.Connection, table: str, allowed: set,
+                 updates: Iterable[Tuple[int, Dict[str, Any]]]) -> int:
+    """
+    updates: [(id, {col: value, ...}), ...] → 같은 컬럼 조합끼리 묶어 executemany 한 번씩,
+    전체를 하나의 트랜잭션으로 (행마다 commit/fsync 하지 않음). 반환: 변경된 행 수.
+    """
+    groups: Dict[Tuple[str, ...], List[List[Any]]] = {}
+    for row_id, fields in updates:
+        cols = tuple(sorted(k for k in fields if k in allowed))
+        if cols:
+            groups.setdefault(cols, []).append([fields[c] for c in cols] + [int(row_id)])
+    changed = 0
+    with conn:  # BEGIN ... COMMIT (에러 시 ROLLBACK)
+        for cols, params in groups.items():
+            sets = ", ".join(f"{c}=?" for c in cols)
+            cur = conn.executemany(
+                f"UPDATE {table} SET {sets}, updated_at_utc=(strftime('%Y-%m-%dT%H:%M:%SZ','now')) WHERE id=?",
+                params,
+            )
+            changed += cur.rowcount
+    return changed
+
+def bulk_update_transactions(conn: sqlite3.Connection, updates: Iterable[Tuple[int, Dict[str, Any]]]) -> int:
+    """update_transaction의 일괄 버전 (허용 필드 동일)."""
+    allowed = {"date_utc","amount","currency","category","payee","direction","notes","account_id"}
+    return _bulk_update(conn, "transactions", allowed, updates)
+
+def soft_delete_transactions(conn: sqlite3.Connection, txn_ids: Iterable[int], deleted: bool = True) -> int:
+    """soft_delete_transaction의 일괄 버전: UPDATE ... WHERE id IN (...) 한 번."""
+    ids = [int(t) for t in txn_ids]
+    if not ids:
+        return 0
+    cur = conn.execute(
+        f"""UPDATE transactions SET is_deleted=?, updated_at_utc=(strftime('%Y-%m-%dT%H:%M:%SZ','now'))
+            WHERE id IN ({','.join('?' * len(ids))})""",
+        [1 if deleted else 0, *ids],
+    )
+    conn.commit()
+    return cur.rowcount
+
 def find_account(conn: sqlite3.Connection, *, name: Optional[str], institution: Optional[str], currency: str) -> Optional[sqlite3.Row]:
     sql = """
     SELECT id, name, institution, currency FROM accounts
@@ -388,3 +558,79 @@ _prev_init_db = init_db
 def init_db(conn: sqlite3.Connection) -> None:  # type: ignore[override]
     _prev_init_db(conn)
     conn.executescript(EXTRA_SCHEMA)
+
+# ---------- Rules ----------
+def add_rule(conn: sqlite3.Connection, *, pattern: str, category: str, match_type: str = "contains",
+             institution: Optional[str] = None, priority: int = 100, enabled: bool = True) -> int:
+    cur = conn.execute(
+        "INSERT INTO rules(pattern,match_type,category,institution,priority,enabled) VALUES(?,?,?,?,?,?)",
+        (pattern, match_type, category, institution, int(priority), 1 if enabled else 0),
+    )
+    conn.commit()
+    return cur.lastrowid
+
+def list_rules(conn: sqlite3.Connection, include_disabled: bool = False) -> List[sqlite3.Row]:
+    where = "" if include_disabled else "WHERE enabled=1"
+    return conn.execute(
+        f"""SELECT id, pattern, match_type, category, institution, priority, enabled
+            FROM rules {where} ORDER BY priority ASC, id ASC"""
+    ).fetchall()
+
+def bulk_update_rules(conn: sqlite3.Connection, updates: Iterable[Tuple[int, Dict[str, Any]]]) -> int:
+    """update_rule의 일괄 버전 (priority/enabled 정규화 동일)."""
+    allowed = {"pattern","match_type","category","institution","priority","enabled"}
+    norm = []
+    for rule_id, fields in updates:
+        f = dict(fields)
+        if "priority" in f:
+            f["priority"] = int(f["priority"])
+        if "enabled" in f:
+            f["enabled"] = 1 if f["enabled"] else 0
+        norm.append((rule_id, f))
+    return _bulk_update(conn, "rules", allowed, norm)
+
+def delete_rule(conn: sqlite3.Connection, rule_id: int) -> int:
+    cur = conn.execute("DELETE FROM rules WHERE id=?", (int(rule_id),))
+    conn.commit()
+    return cur.rowcount
+
+# ---------- Budgets ----------
+def list_budgets(conn: sqlite3.Connection, month: Optional[str] = None) -> List[sqlite3.Row]:
+    """
+    month('YYYY-MM') 지정 시 해당 월 예산 + 공통(month IS NULL) 예산을 함께 반환.
+    month=None이면 전체 예산 반환.
+    """
+    if month is None:
+        return conn.execute(
+            "SELECT id, category, amount, currency, month FROM budgets ORDER BY category, month"
+        ).fetchall()
+    return conn.execute(
+        """SELECT id, category, amount, currency, month FROM budgets
+           WHERE month=? OR month IS NULL
+           ORDER BY category, month""",
+        (month,)
+    ).fetchall()
+
+def upsert_budgets_many(conn: sqlite3.Connection,
+                        rows: Iterable[Tuple[str, float, str, Optional[str]]]) -> int:
+    """
+    rows: iterable of (category, amount, currency, month) — month는 'YYYY-MM' 또는 None(매월 공통).
+    (category, month, currency) 기준 upsert를 한 트랜잭션의 executemany로. 반환: 처리한 행 수.
+    UNIQUE 제약은 NULL month끼리 충돌하지 않으므로(ON CONFLICT 미발동 → 중복 행) `month IS ?`로
+    UPDATE 후 없는 키만 INSERT. 같은 키가 여러 번 오면 마지막 값.
+    """
+    latest = {(cat, cur.upper(), month): float(amt) for cat, amt, cur, month in rows}
+    params = [(cat, amt, cur, month) for (cat, cur, month), amt in latest.items()]
+    with conn:
+        conn.executemany(
+            """UPDATE budgets SET amount=?2, updated_at_utc=(strftime('%Y-%m-%dT%H:%M:%SZ','now'))
+               WHERE category=?1 AND currency=?3 AND month IS ?4""",
+            params,
+        )
+        conn.executemany(
+            """INSERT INTO budgets(category, amount, currency, month)
+               SELECT ?1, ?2, ?3, ?4
+               WHERE NOT EXISTS (SELECT 1 FROM budgets WHERE category=?1 AND currency=?3 AND month IS ?4)""",
+            params,
+        )
+    return len(params)
@@ -1,25 +1,50 @@
 # ledger/fx/fred.py
 from __future__ import annotations
-from typing import List, Dict
-import os, json, requests
+from typing import Iterable, Iterator, List, Dict, Tuple, TYPE_CHECKING
+from functools import lru_cache
+import os, re
 from datetime import date, timedelta
 from pathlib import Path
 
+if TYPE_CHECKING:  # requests는 실제 호출 시점에만 import (모든 페이지의 콜드 스타트 비용 절감)
+    import requests
+
+try:  # optional: 설치돼 있으면 더 빠른 디코더 사용, 없으면 stdlib json
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
 FRED_SERIES = "DEXKOUS"
 FRED_OBS_URL = "https://api.stlouisfed.org/fred/series/observations"
 SOURCE_LABEL = "FRED/DEXKOUS (H.10)"
 
+_ENV_PATH = Path(__file__).resolve().parents[2] / "secrets" / ".env"
+_ENV_KEY_RE = re.compile(r"^[ \t]*FRED_API_KEY=(.*)$", re.M)
+
 def _load_api_key() -> str:
     key = os.getenv("FRED_API_KEY")
     if key:
         return key
-    # fallback: secrets/.env에서 라인 파싱 (간단 로더)
-    envp = Path(__file__).resolve().parents[2] / "secrets" / ".env"
-    if envp.exists():
-        for line in envp.read_text(encoding="utf-8").splitlines():
-            if line.strip().startswith("FRED_API_KEY="):
-                return line.split("=", 1)[1].strip()
-    return ""
+    # fallback: secrets/.env에서 파싱 — 파일이 바뀌기 전(mtime 동일)까지는 캐시된 결과 재사용
+    try:
+        mtime_ns = _ENV_PATH.stat().st_mtime_ns
+    except OSError:
+        return ""
+    return _env_file_key(str(_ENV_PATH), mtime_ns)
+
+@lru_cache(maxsize=1)
+def _env_file_key(path: str, mtime_ns: int) -> str:
+    """(path, mtime)별로 .env를 한 번만 읽고 정규식 한 번으로 FRED_API_KEY 추출."""
+    m = _ENV_KEY_RE.search(Path(path).read_text(encoding="utf-8"))
+    return m.group(1).strip() if m else ""
+
+@lru_cache(maxsize=1)
+def _session() -> requests.Session:
+    """프로세스당 세션 1개: 반복 호출 시 TCP/TLS 연결 재사용 (keep-alive)."""
+    import requests
+    s = requests.Session()
+    s.headers["Accept-Encoding"] = "gzip, deflate"
+    return s
 
 def fetch_dexkous(start: date, end: date) -> List[Dict]:
     """
@@ -37,9 +62,9 @@ def fetch_dexkous(start: date, end: date) -> List[Dict]:
         "observation_start": start.strftime("%Y-%m-%d"),
         "observation_end": end.strftime("%Y-%m-%d"),
     }
-    r = requests.get(FRED_OBS_URL, params=params, timeout=20)
+    r = _session().get(FRED_OBS_URL, params=params, timeout=20)
     r.raise_for_status()
-    data = r.json()
+    data = _json_loads(r.content)  # bytes 그대로 디코드 (r.json()의 인코딩 추정/str 변환 생략)
     return parse_observations(data)
 
 def parse_observations(data: Dict) -> List[Dict]:
@@ -57,3 +82,7 @@ def parse_observations(data: Dict) -> List[Dict]:
         except Exception:
             continue
     return out
+
+def dexkous_rows(observations: Iterable[Dict]) -> Iterator[Tuple[str, str, str, float, str]]:
+    """parse_observations 결과 → upsert_fx_cache_many 행 (date, "USD", "KRW", rate, SOURCE_LABEL) 제너레이터."""
+    return ((o["date"], "USD", "KRW", o["rate"], SOURCE_LABEL) for o in observations)
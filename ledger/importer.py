@@ -2,13 +2,17 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import timedelta
-from typing import Dict, List, Optional
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, Iterator, List, Optional, Sequence
 import difflib
+import warnings
 
+import numpy as np
 import pandas as pd
 from zoneinfo import ZoneInfo
 
-from .db import get_txns_between, get_or_create_account_full, find_account
+from .db import find_duplicate_candidates, get_or_create_account_full, find_account
 
 LOCAL_TZ = ZoneInfo("America/Chicago")
 
@@ -41,6 +45,11 @@ class Mapping:
     institution: Optional[str] = None   # NEW: 기관(은행/카드) 컬럼
 
 
+# txn dict → add_transactions_bulk 행 튜플 (필드 순서 = INSERT 컬럼 순서, C 레벨에서 한 번에 꺼냄)
+txn_insert_row = itemgetter("date_utc", "amount", "currency", "category",
+                            "account_id", "direction", "notes", "payee")
+
+
 def _to_iso_utc(x) -> Optional[str]:
     """Parse date string or pandas.Timestamp to ISO-8601 UTC (YYYY-MM-DDTHH:MM:SSZ)."""
     if pd.isna(x):
@@ -57,100 +66,198 @@ def _to_iso_utc(x) -> Optional[str]:
     return ts.strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
+def _iso_utc_column(s: pd.Series) -> List[Optional[str]]:
+    """
+    Vectorized _to_iso_utc for a whole date column (행 순서 유지, 실패 시 None).
+    컬럼 전체를 pandas C 파서로 한 번에 변환하고, 그게 못 읽은 값(형식 혼재·tz 혼재 등)만
+    행 단위 _to_iso_utc로 다시 시도한다.
+    """
+    try:
+        with warnings.catch_warnings():
+            # 형식 추론 실패 시 pandas가 원소별 dateutil로 떨어지는 건 행 단위 경로와 같은 동작
+            warnings.simplefilter("ignore", UserWarning)
+            ts = pd.to_datetime(s, errors="coerce")
+    except (ValueError, TypeError):
+        ts = None
+    if ts is None or ts.dtype.kind != "M":
+        out = []
+        for x in s.tolist():
+            try:
+                out.append(_to_iso_utc(x))
+            except Exception:
+                out.append(None)
+        return out
+
+    # Treat naive as local (America/Chicago), then convert to UTC
+    # (DST 모호/존재하지 않는 시각은 NaT → 아래 행 단위 경로에서 처리)
+    if ts.dt.tz is None:
+        ts = ts.dt.tz_localize(LOCAL_TZ, ambiguous="NaT", nonexistent="NaT")
+    ts = ts.dt.tz_convert("UTC")
+    iso = ts.dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    out = [v if isinstance(v, str) else None for v in iso.tolist()]
+    for i in np.flatnonzero((ts.isna() & s.notna()).to_numpy()).tolist():
+        try:
+            out[i] = _to_iso_utc(s.iloc[i])
+        except Exception:
+            out[i] = None
+    return out
+
+
+@lru_cache(maxsize=4096)
 def _norm_payee(s: Optional[str]) -> str:
+    # 같은 payee가 후보/입력 양쪽에서 반복 → 정규화 결과 메모이즈
     if s is None:
         return ""
     return " ".join(str(s).strip().lower().split())
 
 
+@lru_cache(maxsize=4096)
 def _similar(a: str, b: str, threshold: float = 0.85) -> bool:
+    """
+    payee 유사도 ≥ threshold (difflib ratio와 같은 결과).
+    같은 (a, b) 쌍이 반복되므로 메모이즈, real_quick_ratio/quick_ratio 상한으로 먼저 걸러서
+    비싼 ratio()는 통과한 쌍에만.
+    """
     if not a or not b:
         return False
-    ratio = difflib.SequenceMatcher(None, a, b).ratio()
-    return ratio >= threshold
+    if a == b:
+        return True
+    sm = difflib.SequenceMatcher(None, a, b)
+    return (sm.real_quick_ratio() >= threshold
+            and sm.quick_ratio() >= threshold
+            and sm.ratio() >= threshold)
+
+
+def dataframe_from_csv(file, encoding: Optional[str] = None, nrows: Optional[int] = None) -> pd.DataFrame:
+    """Read CSV to DataFrame; do not parse dates yet (let mapping decide). nrows: preview용 앞부분만."""
+    return pd.read_csv(file, encoding=encoding, nrows=nrows)
+
+
+def iter_csv_chunks(file, usecols: Optional[List[str]] = None, chunksize: int = 50_000,
+                    encoding: Optional[str] = None,
+                    dtype: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV in chunks, reading only the mapped columns (usecols).
+    file-like 입력은 처음부터 다시 읽도록 seek(0).
+    """
+    if hasattr(file, "seek"):
+        file.seek(0)
+    yield from pd.read_csv(file, usecols=usecols, chunksize=chunksize, encoding=encoding, dtype=dtype)
+
 
+def mapping_dtypes(mapping: Mapping) -> Dict[str, str]:
+    """
+    반복값이 많은 문자열 컬럼(통화/카테고리/계정/기관)은 파싱 단계부터 category로 읽는다.
+    금액은 float64 유지: float32로 줄이면 큰 KRW 금액의 소수점이 깨진다.
+    """
+    cols = [mapping.currency, mapping.category, mapping.account, mapping.institution]
+    return {c: "category" for c in cols if c}
 
-def dataframe_from_csv(file, encoding: Optional[str] = None) -> pd.DataFrame:
-    """Read CSV to DataFrame; do not parse dates yet (let mapping decide)."""
-    return pd.read_csv(file, encoding=encoding)
+
+def mapping_columns(mapping: Mapping) -> List[str]:
+    """Mapping에서 실제로 사용하는 CSV 컬럼 목록 (중복 제거, 순서 유지)."""
+    cols = [mapping.date, mapping.amount, mapping.currency, mapping.payee, mapping.category,
+            mapping.notes, mapping.account, mapping.institution]
+    return list(dict.fromkeys(c for c in cols if c))
+
+
+def _text_values(df: pd.DataFrame, col: Optional[str]) -> List[Optional[str]]:
+    """컬럼을 한 번에 [str | None] 리스트로 (NaN → None). 매핑 안 됨/없는 컬럼이면 전부 None."""
+    if not col or col not in df.columns:
+        return [None] * len(df)
+    s = df[col]
+    return [str(v) if ok else None for v, ok in zip(s.tolist(), s.notna().tolist())]
 
 
 def map_df_to_txns(df: pd.DataFrame, mapping: Mapping, defaults: Defaults) -> List[Dict]:
     """Map arbitrary CSV columns to internal txn dicts; infer direction by amount sign if auto."""
+    if mapping.date not in df.columns or mapping.amount not in df.columns:
+        return []
+
+    # 통화: 대문자 변환/기본값 채우기를 컬럼 단위로 한 번에
+    default_cur = defaults.currency.upper()
+    if mapping.currency and mapping.currency in df.columns:
+        cs = df[mapping.currency]
+        currencies = cs.astype(str).str.upper().where(cs.notna(), default_cur).tolist()
+    else:
+        currencies = [default_cur] * len(df)
+
+    return map_arrays_to_txns(
+        dates_iso=_iso_utc_column(df[mapping.date]),
+        amounts=pd.to_numeric(df[mapping.amount], errors="coerce").to_numpy(dtype=np.float64),
+        currencies=currencies,
+        payees=_text_values(df, mapping.payee),
+        categories=_text_values(df, mapping.category),
+        notes=_text_values(df, mapping.notes),
+        accounts=_text_values(df, mapping.account),
+        institutions=_text_values(df, mapping.institution),
+        defaults=defaults,
+    )
+
+
+def map_arrays_to_txns(*, dates_iso: Sequence[Optional[str]], amounts: np.ndarray, currencies: Sequence[str],
+                       payees: Sequence[Optional[str]], categories: Sequence[Optional[str]],
+                       notes: Sequence[Optional[str]], accounts: Sequence[Optional[str]],
+                       institutions: Sequence[Optional[str]], defaults: Defaults) -> List[Dict]:
+    """
+    Column-array fast path of map_df_to_txns (모든 입력은 같은 길이, 행 순서 동일).
+    dates_iso는 이미 변환된 UTC ISO 문자열(_iso_utc_column 결과).
+    방향/절대값은 numpy로 한 번에 계산하고, 금액이 숫자가 아니거나 날짜가 없는 행은 건너뛴다.
+    """
+    if defaults.direction == "auto":
+        directions = np.where(amounts < 0, "debit", "credit")
+    else:
+        directions = np.full(len(amounts), defaults.direction)
+    valid = ~np.isnan(amounts)
+
     rows: List[Dict] = []
-    for _, r in df.iterrows():
-        try:
-            date_iso = _to_iso_utc(r[mapping.date])
-            if not date_iso:
-                continue
-            amount = float(r[mapping.amount])
-
-            if mapping.currency and not pd.isna(r[mapping.currency]):
-                currency = str(r[mapping.currency]).upper()
-            else:
-                currency = defaults.currency.upper()
-
-            payee = (
-                None
-                if (not mapping.payee or pd.isna(r.get(mapping.payee, None)))
-                else str(r[mapping.payee])
-            )
-            category = (
-                None
-                if (not mapping.category or pd.isna(r.get(mapping.category, None)))
-                else str(r[mapping.category])
-            )
-            notes = (
-                None
-                if (not mapping.notes or pd.isna(r.get(mapping.notes, None)))
-                else str(r[mapping.notes])
-            )
-
-            direction = defaults.direction
-            amt = amount
-            if defaults.direction == "auto":
-                if amount < 0:
-                    direction = "debit"
-                    amt = abs(amount)
-                else:
-                    direction = "credit"
-            else:
-                amt = abs(amount)
-
-            rows.append(
-                {
-                    "date_utc": date_iso,
-                    "amount": float(amt),
-                    "currency": currency,
-                    "category": category or defaults.category,
-                    "payee": payee,
-                    "direction": direction,
-                    "notes": notes,
-                }
-            )
-        except Exception:
+    for date_iso, ok, amt, direction, currency, payee, category, note, account_hint, institution_hint in zip(
+        dates_iso, valid.tolist(), np.abs(amounts).tolist(), directions.tolist(),
+        currencies, payees, categories, notes, accounts, institutions,
+    ):
+        if not ok or not date_iso:
             # skip bad rows silently for MVP
             continue
+        rows.append(
+            {
+                "date_utc": date_iso,
+                "amount": amt,
+                "currency": currency,
+                "category": category or defaults.category,
+                "payee": payee,
+                "direction": direction,
+                "notes": note,
+                "account_hint": account_hint,
+                "institution_hint": institution_hint,
+            }
+        )
     return rows
 
 
-def mark_duplicates(conn, account_id: int, txns: List[Dict]) -> List[Dict]:
-    """Mark duplicates by (same account, |date diff| ≤ 1d, same amount, similar payee)."""
+def mark_duplicates(conn, account_id: int, txns: List[Dict], inplace: bool = False) -> List[Dict]:
+    """
+    Mark duplicates by (same account, |date diff| ≤ 1d, same amount, similar payee).
+    기간/금액 조건은 SQL 한 번(find_duplicate_candidates)으로 후보만 가져오고, payee 유사도만 Python에서.
+    inplace=True: 입력 dict에 "duplicate"를 직접 기록 (호출자가 원본을 다시 쓰지 않을 때 — 행마다 dict 복사 X).
+    """
+    if not txns:
+        return []
+    fmt = "%Y-%m-%dT%H:%M:%SZ"
+    stamps = pd.to_datetime([t["date_utc"] for t in txns], utc=True)
+    starts = (stamps - timedelta(days=1)).strftime(fmt).tolist()
+    ends = (stamps + timedelta(days=1)).strftime(fmt).tolist()
+    windows = [(s, e, float(t["amount"])) for s, e, t in zip(starts, ends, txns)]
+
+    candidates: Dict[int, List[str]] = {}
+    for r in find_duplicate_candidates(conn, account_id, windows):
+        candidates.setdefault(int(r["i"]), []).append(_norm_payee(r["payee"]))
+
     out: List[Dict] = []
-    for t in txns:
-        date_ts = pd.to_datetime(t["date_utc"], utc=True)
-        start = (date_ts - timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
-        end = (date_ts + timedelta(days=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
-        existing = get_txns_between(conn, account_id, start, end)
-        dup = False
+    for i, t in enumerate(txns):
         npayee = _norm_payee(t.get("payee"))
-        for e in existing:
-            if abs(float(e["amount"]) - float(t["amount"])) < 1e-6:
-                ep = _norm_payee(e["payee"])
-                if (npayee == "" and ep == "") or _similar(npayee, ep):
-                    dup = True
-                    break
-        tt = dict(t)
+        dup = any((npayee == "" and ep == "") or _similar(npayee, ep) for ep in candidates.get(i, ()))
+        tt = t if inplace else dict(t)
         tt["duplicate"] = dup
         out.append(tt)
     return out
@@ -176,7 +283,23 @@ def guess_institution_from_payee(payee: Optional[str]) -> Optional[str]:
     return None
 
 def resolve_account_id(conn, *, currency: str, account_name: Optional[str], institution: Optional[str],
-                       payee: Optional[str], defaults_by_currency: dict, auto_create: bool = True) -> int:
+                       payee: Optional[str], defaults_by_currency: dict, auto_create: bool = True,
+                       memo: Optional[dict] = None) -> int:
+    """
+    memo: import 배치 동안 공유하는 dict → 같은 (통화, 계정명, 기관, payee 추정 기관) 조합은
+    find_account 조회를 한 번만 (행마다 최대 3~4번 SELECT X). 자동 생성된 계정도 그대로 재사용된다.
+    """
+    if memo is None:
+        return _resolve_account_id(conn, currency=currency, account_name=account_name, institution=institution,
+                                   payee=payee, defaults_by_currency=defaults_by_currency, auto_create=auto_create)
+    key = ((currency or "KRW").upper(), account_name, institution, guess_institution_from_payee(payee))
+    if key not in memo:
+        memo[key] = _resolve_account_id(conn, currency=currency, account_name=account_name, institution=institution,
+                                        payee=payee, defaults_by_currency=defaults_by_currency, auto_create=auto_create)
+    return memo[key]
+
+def _resolve_account_id(conn, *, currency: str, account_name: Optional[str], institution: Optional[str],
+                        payee: Optional[str], defaults_by_currency: dict, auto_create: bool = True) -> int:
     cur = (currency or "KRW").upper()
     # 1) (account_name, institution, currency)로 직접 조회
     row = find_account(conn, name=(account_name if account_name else None),
@@ -1,39 +1,145 @@
 # ledger/rules.py
 from __future__ import annotations
 import re
-from typing import Optional
+from typing import Any, Iterable, List, Mapping, Optional, Sequence, Tuple
 import sqlite3
 
-def apply_category_rules(conn: sqlite3.Connection, *, payee: Optional[str], institution: Optional[str]) -> Optional[str]:
+from .db import list_rules
+from .sqlfuncs import _compile
+
+# (category, match_type, pattern 소문자, 컴파일된 regex | None, institution 필터 소문자 | None)
+PreparedRule = Tuple[str, str, str, Optional[re.Pattern], Optional[str]]
+
+
+def prepare_rules(rules: Iterable[Mapping[str, Any]]) -> Tuple[PreparedRule, ...]:
     """
-    활성 룰을 우선순위(priority ASC)로 평가.
-    match_type='contains' → pattern(소문자)이 payee/institution 소문자에 포함되면 매치
-    match_type='regex'     → re.search(pattern, payee) 매치
-    institution 컬럼이 설정된 룰은 동일 institution일 때만 매치.
-    매치되면 해당 rule.category 반환. 없으면 None.
+    list_rules 결과(priority ASC) → 매칭용 튜플. 비활성/알 수 없는 match_type은 여기서 제외하고,
+    소문자 변환·regex 컴파일은 룰당 한 번만 (거래마다 반복 X).
     """
-    rows = conn.execute("SELECT * FROM rules WHERE enabled=1 ORDER BY priority ASC, id ASC").fetchall()
+    out: List[PreparedRule] = []
+    for r in rules:
+        if not r["enabled"]:
+            continue
+        mtype = (r["match_type"] or "contains")
+        if mtype not in ("contains", "regex"):
+            continue
+        pat = (r["pattern"] or "")
+        rx = _compile(pat) if mtype == "regex" else None
+        if mtype == "regex" and rx is None:
+            continue  # 잘못된 정규식은 무시
+        out.append((r["category"], mtype, pat.lower(), rx, (r["institution"] or "").lower() or None))
+    return tuple(out)
+
+
+def load_rules(conn: sqlite3.Connection) -> Tuple[PreparedRule, ...]:
+    """활성 룰을 한 번 읽어 prepare_rules로 변환 — import 배치 시작 시 한 번 호출."""
+    return prepare_rules(list_rules(conn))
+
+
+def apply_prepared_rules(rules: Sequence[PreparedRule], *,
+                         payee: Optional[str], institution: Optional[str]) -> Optional[str]:
+    """prepare_rules/load_rules 결과로 apply_category_rules와 같은 평가 (첫 매치의 category)."""
     p = (payee or "").lower()
     inst = (institution or "").lower()
-    for r in rows:
-        pat = (r["pattern"] or "")
-        mtype = (r["match_type"] or "contains")
-        inst_only = (r["institution"] or None)
-        if inst_only and inst_only.lower() not in inst:
+    for category, mtype, pat, rx, inst_only in rules:
+        if inst_only and inst_only not in inst:
             continue
-        ok = False
         if mtype == "contains":
-            s = pat.lower()
-            ok = (s in p) or (s in inst)
-        elif mtype == "regex":
-            try:
-                if p and re.search(pat, p, flags=re.IGNORECASE):
-                    ok = True
-                elif inst and re.search(pat, inst, flags=re.IGNORECASE):
-                    ok = True
-            except re.error:
-                # 잘못된 정규식은 무시
-                ok = False
+            ok = (pat in p) or (pat in inst)
+        else:
+            ok = bool((p and rx.search(p)) or (inst and rx.search(inst)))
         if ok:
-            return r["category"]
+            return category
     return None
+
+
+def apply_category_rules_precomputed(rules: Sequence[Mapping[str, Any]], *,
+                                     payee: Optional[str], institution: Optional[str]) -> Optional[str]:
+    """
+    apply_category_rules와 동일하되, 이미 읽어 둔 룰 목록(list_rules 결과, priority ASC)을 받는다.
+    거래마다 반복 평가할 때는 prepare_rules/load_rules + apply_prepared_rules를 쓸 것.
+    """
+    return apply_prepared_rules(prepare_rules(rules), payee=payee, institution=institution)
+
+
+def apply_category_rules(conn: sqlite3.Connection, *, payee: Optional[str], institution: Optional[str]) -> Optional[str]:
+    """
+    활성 룰을 우선순위(priority ASC)로 평가.
+    match_type='contains' → pattern(소문자)이 payee/institution 소문자에 포함되면 매치
+    match_type='regex'     → re.search(pattern, payee) 매치
+    institution 컬럼이 설정된 룰은 동일 institution일 때만 매치.
+    매치되면 해당 rule.category 반환. 없으면 None.
+    """
+    return apply_prepared_rules(load_rules(conn), payee=payee, institution=institution)
+
+def bulk_reapply_rules(conn: sqlite3.Connection, *,
+                       start_iso: Optional[str] = None,
+                       end_iso: Optional[str] = None,
+                       include_deleted: bool = False,
+                       limit: Optional[int] = None,
+                       txn_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    apply_category_rules와 같은 규칙으로 대상 거래의 category를 UPDATE 한 번에 재적용.
+    대상: list_transactions_joined와 같은 기간/삭제/limit 조건 (txn_ids가 주어지면 그 id로 한정).
+    거래마다 룰 SELECT + UPDATE를 반복하지 않고, 거래×룰 조인에서 priority ASC, id ASC 첫 매치만 채택.
+    소문자 변환은 py_lower(UDF, Python str.lower)로 → 비ASCII(예: 'CAFÉ')도 Python 평가와 동일. NULL pattern은 ''와 같게.
+    반환: category가 바뀐 행 수.
+    """
+    clauses = ["1=1"]
+    params: List[Any] = []
+    if not include_deleted:
+        clauses.append("t.is_deleted=0")
+    if start_iso:
+        clauses.append("t.date_utc >= ?")
+        params.append(start_iso)
+    if end_iso:
+        clauses.append("t.date_utc <= ?")
+        params.append(end_iso)
+    if txn_ids is not None:
+        ids = [int(i) for i in txn_ids]
+        if not ids:
+            return 0
+        clauses.append(f"t.id IN ({','.join('?' * len(ids))})")
+        params.extend(ids)
+    limit_sql = ""
+    if limit is not None:
+        limit_sql = "LIMIT ?"
+        params.append(int(limit))
+
+    q = f"""
+    WITH win AS (
+      SELECT t.id, coalesce(py_lower(t.payee), '') AS p, coalesce(py_lower(a.institution), '') AS inst
+      FROM transactions t
+      JOIN accounts a ON a.id = t.account_id
+      WHERE {" AND ".join(clauses)}
+      ORDER BY t.date_utc DESC
+      {limit_sql}
+    ),
+    ranked AS (
+      SELECT w.id, r.category,
+             ROW_NUMBER() OVER (PARTITION BY w.id ORDER BY r.priority ASC, r.id ASC) AS rn
+      FROM win w
+      JOIN rules r
+        ON r.enabled = 1
+       AND (coalesce(r.institution, '') = '' OR instr(w.inst, py_lower(r.institution)) > 0)
+       AND (
+             (coalesce(r.match_type, 'contains') = 'contains'
+              AND (instr(w.p, coalesce(py_lower(r.pattern), '')) > 0
+                   OR instr(w.inst, coalesce(py_lower(r.pattern), '')) > 0))
+          OR (r.match_type = 'regex'
+              AND (w.p REGEXP coalesce(r.pattern, '') OR w.inst REGEXP coalesce(r.pattern, '')))
+       )
+    )
+    UPDATE transactions
+       SET category = ranked.category,
+           updated_at_utc = (strftime('%Y-%m-%dT%H:%M:%SZ','now'))
+      FROM ranked
+     WHERE ranked.id = transactions.id
+       AND ranked.rn = 1
+       AND ranked.category <> ''
+       AND transactions.category IS NOT ranked.category
+    """
+    with conn:  # REGEXP는 get_conn에서 등록 (ledger/sqlfuncs.py)
+        conn.execute(q, params)
+        # WITH로 시작하는 문은 cursor.rowcount가 -1 → changes()로 직접 읽는다
+        return conn.execute("SELECT changes()").fetchone()[0]
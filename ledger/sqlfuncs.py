@@ -0,0 +1,67 @@
+# ledger/sqlfuncs.py
+from __future__ import annotations
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo
+import re
+import sqlite3
+
+LOCAL_TZ = ZoneInfo("America/Chicago")
+
+
+# ---------- Python UDFs (연결을 열 때 한 번만 등록) ----------
+# 앱은 프로세스 전체가 연결 하나를 공유한다. 실행 중인 문이 있으면 SQLite가 함수 재정의를
+# 거부하므로("Error creating function") 쿼리마다 create_function을 부르면 안 된다.
+
+@lru_cache(maxsize=8192)
+def _local_ym_for_hour(hour_prefix: str) -> str:
+    # Chicago의 UTC 오프셋은 정시 단위로만 바뀜 → 'YYYY-MM-DDTHH' 단위 캐시로 충분
+    dt = datetime.strptime(hour_prefix, "%Y-%m-%dT%H").replace(tzinfo=timezone.utc)
+    return dt.astimezone(LOCAL_TZ).strftime("%Y-%m")
+
+
+def _local_ym(date_utc: Optional[str]) -> Optional[str]:
+    """
+    SQLite 함수 local_ym(date_utc): UTC ISO → 현지 tz 'YYYY-MM' (DST 반영).
+    UDF 예외는 쿼리 전체를 중단시키므로 관대하게: 날짜만 있으면 UTC 자정(pd.to_datetime과 같음), 그 외는 NULL.
+    """
+    if not date_utc:
+        return None
+    try:
+        return _local_ym_for_hour(date_utc[:13])
+    except ValueError:
+        pass
+    try:
+        return _local_ym_for_hour(date_utc[:10] + "T00")
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=256)
+def _compile(pattern: str) -> Optional[re.Pattern]:
+    """룰 패턴 컴파일 캐시 (행마다 re.search 재컴파일 X). 잘못된 정규식은 None."""
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error:
+        return None
+
+
+def _regexp(pattern: Optional[str], text: Optional[str]) -> int:
+    """SQLite `text REGEXP pattern` 구현 (대소문자 무시). 잘못된 정규식은 apply_category_rules처럼 미매치."""
+    if pattern is None or not text:
+        return 0
+    rx = _compile(pattern)
+    return 1 if rx is not None and rx.search(text) else 0
+
+
+def _py_lower(text: Optional[str]) -> Optional[str]:
+    """SQLite 함수 py_lower(x): 내장 lower()는 ASCII만 접으므로 Python str.lower()와 같은 결과로 (NULL은 그대로)."""
+    return text.lower() if isinstance(text, str) else text
+
+
+def register_functions(conn: sqlite3.Connection) -> None:
+    """get_conn에서 호출: 이 연결에서 쓰는 사용자 정의 SQL 함수를 등록."""
+    conn.create_function("local_ym", 1, _local_ym, deterministic=True)
+    conn.create_function("REGEXP", 2, _regexp, deterministic=True)
+    conn.create_function("py_lower", 1, _py_lower, deterministic=True)
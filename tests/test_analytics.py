@@ -13,3 +13,66 @@ def test_mann_kendall_uptrend():
     # n>=6 이면 p가 존재하고 어느 정도 작아야 함(엄격 값은 회피)
     if p is not None:
         assert p < 0.2
+
+def test_budget_vs_actual_fx_and_budget_precedence(tmp_path):
+    from ledger.db import bootstrap, add_account, add_transaction, upsert_fx_cache_many
+    from ledger.analytics import budget_vs_actual, month_actuals_by_category
+    conn = bootstrap(str(tmp_path / "test.sqlite3"))
+    aid = add_account(conn, name="Test", institution=None, currency="KRW")
+    upsert_fx_cache_many(conn, [("2025-10-01", "USD", "KRW", 1400.0, "test")])
+    for amt, cur in ((10000, "KRW"), (10, "USD")):
+        add_transaction(conn, date_utc="2025-10-15T12:00:00Z", amount=amt, currency=cur,
+                        category="Food", account_id=aid, direction="debit")
+    conn.executemany(
+        "INSERT INTO budgets(category, amount, currency, month) VALUES(?,?,?,?)",
+        [("Food", 300000, "KRW", "2025-10"), ("Food", 200000, "KRW", None),
+         ("Rent", 900000, "KRW", None)],
+    )
+    df = budget_vs_actual(conn, base="KRW", year=2025, month=10).set_index("category")
+    assert df.loc["Food", "actual"] == 10000 + 10 * 1400.0
+    assert df.loc["Food", "budget"] == 300000  # 월 지정이 공통보다 우선
+    assert df.loc["Rent", "actual"] == 0.0 and df.loc["Rent", "budget"] == 900000
+    # 같은 집계 CTE → 예산만 있는 카테고리(Rent)는 실적 dict에 없음
+    assert month_actuals_by_category(conn, base="KRW", year=2025, month=10) == {"Food": 10000 + 10 * 1400.0}
+
+def test_monthly_category_totals_fx_asof(tmp_path):
+    from ledger.db import bootstrap, add_account, add_transaction, upsert_fx_cache_many
+    from ledger.analytics import monthly_category_totals
+    conn = bootstrap(str(tmp_path / "test.sqlite3"))
+    aid = add_account(conn, name="Test", institution=None, currency="USD")
+    upsert_fx_cache_many(conn, [("2025-10-01", "USD", "KRW", 1400.0, "test"), ("2025-10-10", "USD", "KRW", 1500.0, "test")])
+    for ts, amt in (("09-30T12", 1), ("10-05T12", 10), ("10-10T12", 20),  # 9/30은 이전 환율이 없어 제외
+                    ("11-01T04", 5)):  # UTC 11/1 04시 = 시카고 10/31 → 10월
+        add_transaction(conn, date_utc=f"2025-{ts}:00:00Z", amount=amt, currency="USD",
+                        category="Food", account_id=aid, direction="debit")
+    pts = monthly_category_totals(conn, "KRW", None, None)["Food"]
+    assert [(p.month, p.value) for p in pts] == [("2025-10", 10 * 1400.0 + 25 * 1500.0)]
+
+def test_aggregations_with_open_cursor(tmp_path):
+    # 공유 연결에서 다른 커서가 읽는 중이어도 집계가 실패하지 않아야 함 (UDF는 연결당 한 번 등록)
+    from ledger.db import bootstrap, add_account, add_transaction
+    from ledger.analytics import spend_by_institution, mtd_spend
+    conn = bootstrap(str(tmp_path / "db.sqlite3"))
+    a = add_account(conn, "Card", "Chase", "KRW", "card", 0.0)
+    for d in ("2025-10-01T00:00:00Z", "2025-10-02T00:00:00Z"):
+        add_transaction(conn, date_utc=d, amount=10.0, currency="KRW",
+                        category="Food", account_id=a, direction="debit")
+    spend_by_institution(conn, "KRW", None, None)
+    cur = conn.execute("SELECT id FROM transactions")
+    cur.fetchone()  # 문이 아직 실행 중인 상태
+    df = spend_by_institution(conn, "KRW", None, None)
+    assert df["amount_base"].tolist() == [20.0]
+    assert mtd_spend(conn, "KRW") is not None
+
+def test_local_ym_tolerates_date_only_rows(tmp_path):
+    from ledger.db import bootstrap, add_account, add_transaction
+    from ledger.analytics import monthly_category_totals
+    conn = bootstrap(str(tmp_path / "test.sqlite3"))
+    aid = add_account(conn, name="Test", institution=None, currency="KRW")
+    add_transaction(conn, date_utc="2025-10-15T12:00:00Z", amount=100, currency="KRW",
+                    category="Food", account_id=aid, direction="debit")
+    # 수동 입력/옛 데이터: 시각 없는 날짜 → UTC 자정으로 해석 (쿼리가 UDF 예외로 중단되지 않음)
+    add_transaction(conn, date_utc="2025-10-20", amount=5, currency="KRW",
+                    category="Food", account_id=aid, direction="debit")
+    got = monthly_category_totals(conn, base="KRW", start_iso=None, end_iso=None)
+    assert [(p.month, p.value) for p in got["Food"]] == [("2025-10", 105.0)]
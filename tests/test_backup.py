@@ -19,3 +19,60 @@ def test_backup_cycle(tmp_path):
     assert pruned >= 1
     backs2 = list_backups(tmp_path, prefix="t", limit=10)
     assert len(backs2) == 2
+
+def test_backup_missing_db_raises(tmp_path):
+    import sqlite3
+    import pytest
+    missing = tmp_path / "nope.sqlite3"
+    with pytest.raises(sqlite3.OperationalError):
+        create_backup(missing, tmp_path / "b", prefix="t", keep_last=None)
+    assert not missing.exists()  # 빈 원본 DB를 만들지 않음
+
+def test_daily_backup_async_marker(tmp_path):
+    from ledger.backup import ensure_daily_backup_async
+    dbp = tmp_path / "db.sqlite3"
+    bootstrap(str(dbp))
+
+    t = ensure_daily_backup_async(dbp, tmp_path, prefix="t", keep_last=5)
+    assert t is not None
+    t.join(timeout=10)
+    assert len(list_backups(tmp_path, prefix="t")) == 1
+    assert list(tmp_path.glob(".last_*"))
+
+    # 마커가 있으면 스레드를 띄우지 않음
+    assert ensure_daily_backup_async(dbp, tmp_path, prefix="t", keep_last=5) is None
+
+def test_daily_backup_once_per_day(tmp_path):
+    from ledger.backup import ensure_daily_backup
+    dbp = tmp_path / "db.sqlite3"
+    bootstrap(str(dbp))
+
+    assert ensure_daily_backup(dbp, tmp_path, prefix="t", keep_last=5) is True
+    assert list(tmp_path.glob(".last_*"))
+    assert ensure_daily_backup(dbp, tmp_path, prefix="t", keep_last=5) is False
+
+    # 마커가 없어도 오늘 백업 파일이 있으면 새로 만들지 않고 마커만 복구
+    for m in tmp_path.glob(".last_*"):
+        m.unlink()
+    assert ensure_daily_backup(dbp, tmp_path, prefix="t", keep_last=5) is False
+    assert list(tmp_path.glob(".last_*"))
+    assert len(list_backups(tmp_path, prefix="t")) == 1
+
+def test_daily_backup_marker_per_prefix(tmp_path):
+    from ledger.backup import ensure_daily_backup
+    dbp = tmp_path / "db.sqlite3"
+    bootstrap(str(dbp))
+
+    # 같은 디렉터리라도 prefix마다 하루 한 번 (다른 prefix의 마커에 막히거나 지우지 않음)
+    assert ensure_daily_backup(dbp, tmp_path, prefix="a", keep_last=5) is True
+    assert ensure_daily_backup(dbp, tmp_path, prefix="b", keep_last=5) is True
+    assert ensure_daily_backup(dbp, tmp_path, prefix="a", keep_last=5) is False
+    assert ensure_daily_backup(dbp, tmp_path, prefix="b", keep_last=5) is False
+    assert len(list(tmp_path.glob(".last_a_*"))) == 1 and len(list(tmp_path.glob(".last_b_*"))) == 1
+
+    # 오늘 백업 파일이 지워지면 마커가 있어도 다시 만든다
+    for f in list_backups(tmp_path, prefix="a"):
+        f.unlink()
+    assert ensure_daily_backup(dbp, tmp_path, prefix="a", keep_last=5) is True
+    assert len(list_backups(tmp_path, prefix="a")) == 1
+    assert len(list_backups(tmp_path, prefix="b")) == 1
@@ -16,3 +16,110 @@ def test_db_roundtrip(tmp_path):
     )
     assert count_rows(conn, "accounts") == 1
     assert count_rows(conn, "transactions") == 1
+
+def test_list_budgets_month_and_common(tmp_path):
+    from ledger.db import list_budgets
+    conn = bootstrap(str(tmp_path / "test.sqlite3"))
+    conn.executemany(
+        "INSERT INTO budgets(category, amount, currency, month) VALUES(?,?,?,?)",
+        [("Food", 300000, "KRW", "2025-10"), ("Food", 200000, "KRW", None),
+         ("Coffee", 50000, "KRW", "2025-09")],
+    )
+    rows = list_budgets(conn, month="2025-10")
+    # 해당 월 + 공통(NULL)만, 다른 달은 제외
+    assert {(r["category"], r["month"]) for r in rows} == {("Food", None), ("Food", "2025-10")}
+
+def test_upsert_fx_cache_many_updates_existing(tmp_path):
+    from ledger.db import upsert_fx_cache_many, get_latest_fx
+    conn = bootstrap(str(tmp_path / "test.sqlite3"))
+    n = upsert_fx_cache_many(conn, [("2025-10-01", "usd", "krw", 1300.0, "t"),
+                                    ("2025-10-02", "USD", "KRW", 1310.0, "t")])
+    assert n == 2
+    upsert_fx_cache_many(conn, [("2025-10-02", "USD", "KRW", 1320.0, "t2")])
+    assert count_rows(conn, "fx_cache") == 2
+    latest = get_latest_fx(conn, "USD", "KRW")
+    assert latest["rate"] == 1320.0 and latest["source"] == "t2"
+
+def test_add_transactions_bulk(tmp_path):
+    from ledger.db import add_transactions_bulk
+    conn = bootstrap(str(tmp_path / "test.sqlite3"))
+    aid = add_account(conn, name="Card", institution=None, currency="USD")
+    n = add_transactions_bulk(conn, [
+        ("2025-10-01T00:00:00Z", 12.5, "usd", "Food", aid, "debit", None, "Shop"),
+        ("2025-10-02T00:00:00Z", 100, "USD", "Income", aid, "credit", "memo", None),
+    ])
+    assert n == 2 and count_rows(conn, "transactions") == 2
+    assert conn.execute("SELECT COUNT(*) FROM transactions WHERE currency='USD'").fetchone()[0] == 2
+
+def test_account_txn_counts_grouped(tmp_path):
+    from ledger.db import get_all_account_txn_counts, soft_delete_transaction
+    conn = bootstrap(str(tmp_path / "t.sqlite3"))
+    a1 = add_account(conn, name="A", institution=None, currency="KRW")
+    a2 = add_account(conn, name="B", institution=None, currency="USD")
+    add_account(conn, name="Empty", institution=None, currency="KRW")
+    tid = add_transaction(conn, date_utc="2025-01-01T00:00:00Z", amount=1.0, currency="KRW",
+                          category="Food", account_id=a1, direction="debit")
+    add_transaction(conn, date_utc="2025-01-02T00:00:00Z", amount=2.0, currency="KRW",
+                    category="Food", account_id=a1, direction="debit")
+    add_transaction(conn, date_utc="2025-01-02T00:00:00Z", amount=3.0, currency="USD",
+                    category="Food", account_id=a2, direction="debit")
+    soft_delete_transaction(conn, tid)
+    assert get_all_account_txn_counts(conn) == {a1: 1, a2: 1}
+    assert get_all_account_txn_counts(conn, include_deleted=True) == {a1: 2, a2: 1}
+
+def test_get_accounts_has_manage_columns(tmp_path):
+    from ledger.db import get_accounts
+    conn = bootstrap(str(tmp_path / "t.sqlite3"))
+    add_account(conn, name="Card", institution="Chase", currency="USD", type="card", opening_balance=10)
+    row = dict(get_accounts(conn)[0])
+    assert {"id", "name", "institution", "currency", "type", "opening_balance"} <= row.keys()
+
+def test_update_accounts_bulk(tmp_path):
+    from ledger.db import update_accounts_bulk, get_accounts
+    conn = bootstrap(str(tmp_path / "t.sqlite3"))
+    a1 = add_account(conn, name="A", institution="X", currency="KRW")
+    a2 = add_account(conn, name="B", institution=None, currency="USD")
+    n = update_accounts_bulk(conn, [
+        {"id": a1, "name": "A2", "institution": None, "currency": "krw", "type": "cash", "opening_balance": 5},
+        {"id": a2, "name": "B2", "institution": "Chase", "currency": "USD", "type": "card", "opening_balance": 0},
+    ])
+    assert n == 2
+    rows = {r["id"]: dict(r) for r in get_accounts(conn)}
+    assert rows[a1]["name"] == "A2" and rows[a1]["institution"] is None and rows[a1]["currency"] == "KRW"
+    assert rows[a2]["institution"] == "Chase" and rows[a2]["type"] == "card"
+    # 빈 문자열/NaN(pandas 결측)은 "nan" 문자열이 아니라 NULL로
+    update_accounts_bulk(conn, [
+        {"id": a1, "name": "A2", "institution": float("nan"), "currency": "KRW", "type": "cash", "opening_balance": 5},
+        {"id": a2, "name": "B2", "institution": " ", "currency": "USD", "type": "card", "opening_balance": 0},
+    ])
+    assert all(r["institution"] is None for r in get_accounts(conn))
+
+def test_bulk_update_and_soft_delete_transactions(tmp_path):
+    from ledger.db import bulk_update_transactions, soft_delete_transactions
+    conn = bootstrap(str(tmp_path / "t.sqlite3"))
+    aid = add_account(conn, name="A", institution=None, currency="KRW")
+    ids = [add_transaction(conn, date_utc="2025-01-01T00:00:00Z", amount=float(i), currency="KRW",
+                           category="Food", account_id=aid, direction="debit") for i in range(3)]
+    n = bulk_update_transactions(conn, [
+        (ids[0], {"category": "Coffee"}),
+        (ids[1], {"category": "Taxi", "notes": "late"}),
+        (ids[2], {"is_deleted": 1}),  # 허용 필드 아님 → 무시
+    ])
+    assert n == 2
+    assert soft_delete_transactions(conn, [ids[0], ids[2]]) == 2
+    rows = {r["id"]: r for r in conn.execute("SELECT id, category, notes, is_deleted FROM transactions")}
+    assert rows[ids[0]]["category"] == "Coffee" and rows[ids[0]]["is_deleted"] == 1
+    assert rows[ids[1]]["notes"] == "late" and rows[ids[1]]["is_deleted"] == 0
+
+def test_upsert_budgets_many(tmp_path):
+    from ledger.db import upsert_budgets_many, list_budgets
+    conn = bootstrap(str(tmp_path / "t.sqlite3"))
+    upsert_budgets_many(conn, [("Food", 100, "krw", "2025-01"), ("Coffee", 20, "KRW", "2025-01")])
+    upsert_budgets_many(conn, [("Food", 150, "KRW", "2025-01")])
+    got = {r["category"]: r["amount"] for r in list_budgets(conn, month="2025-01")}
+    assert got == {"Food": 150.0, "Coffee": 20.0}
+    # month=None(매월 공통)도 같은 키면 갱신 — NULL은 UNIQUE에서 서로 다른 값
+    upsert_budgets_many(conn, [("Food", 10, "KRW", None)])
+    upsert_budgets_many(conn, [("Food", 30, "krw", None), ("Food", 40, "KRW", None)])
+    rows = conn.execute("SELECT amount FROM budgets WHERE category='Food' AND month IS NULL").fetchall()
+    assert [r["amount"] for r in rows] == [40.0]
@@ -10,3 +10,16 @@ def test_parse_observations_filters_dots():
     assert len(out) == 1
     assert out[0]["date"] == "2025-10-14"
     assert out[0]["rate"] == 1429.91
+
+def test_dexkous_rows_upsert():
+    from ledger.db import bootstrap, get_latest_fx, upsert_fx_cache_many
+    from ledger.fx.fred import dexkous_rows, SOURCE_LABEL
+    conn = bootstrap(":memory:")
+    obs = parse_observations({"observations": [
+        {"date": "2025-10-13", "value": "1420.5"},
+        {"date": "2025-10-14", "value": "1429.91"},
+    ]})
+    assert upsert_fx_cache_many(conn, dexkous_rows(obs)) == 2
+    row = get_latest_fx(conn, "USD", "KRW")
+    assert row["date_utc"] == "2025-10-14" and row["rate"] == 1429.91
+    assert row["source"] == SOURCE_LABEL
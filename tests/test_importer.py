@@ -20,3 +20,33 @@ def test_mapping_and_direction():
     assert txns[1]["direction"] == "credit"
     assert txns[0]["amount"] == 1000.0
     assert txns[0]["currency"] == "KRW"
+
+
+def test_mark_duplicates_batch_window(tmp_path):
+    from ledger.db import bootstrap, add_account, add_transaction
+    from ledger.importer import mark_duplicates
+
+    conn = bootstrap(str(tmp_path / "test.sqlite3"))
+    aid = add_account(conn, name="Card", institution=None, currency="KRW")
+    add_transaction(conn, date_utc="2025-10-01T12:00:00Z", amount=1000, currency="KRW",
+                    category="Food", account_id=aid, direction="debit", payee="Shop")
+    txns = [
+        {"date_utc": "2025-10-02T06:00:00Z", "amount": 1000.0, "payee": "shop"},   # ≤1d, 같은 금액
+        {"date_utc": "2025-10-05T12:00:00Z", "amount": 1000.0, "payee": "Shop"},   # 기간 밖
+        {"date_utc": "2025-10-01T13:00:00Z", "amount": 999.0, "payee": "Shop"},    # 금액 다름
+    ]
+    out = mark_duplicates(conn, aid, txns)
+    assert [t["duplicate"] for t in out] == [True, False, False]
+
+
+def test_csv_chunks_keep_hints_aligned():
+    import io
+    from ledger.importer import iter_csv_chunks, mapping_columns, mapping_dtypes
+
+    csv = io.StringIO("d,amt,acct,memo\nbad,-1,A,x\n2025-10-01,-5,B,y\n2025-10-02,7,C,z\n")
+    m = Mapping(date="d", amount="amt", account="acct")
+    txns = []
+    for chunk in iter_csv_chunks(csv, usecols=mapping_columns(m), chunksize=2, dtype=mapping_dtypes(m)):
+        txns.extend(map_df_to_txns(chunk, m, Defaults(currency="KRW")))
+    # 날짜가 잘못된 행은 건너뛰어도 힌트는 자기 행 값을 유지
+    assert [t["account_hint"] for t in txns] == ["B", "C"]
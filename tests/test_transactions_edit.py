@@ -28,3 +28,41 @@ def test_update_and_soft_delete(tmp_path):
     assert rc == 1
     rows = list_transactions_joined(conn, include_deleted=False, limit=10)
     assert len(rows) == 0  # 숨김
+
+def test_bulk_reapply_rules_matches_apply_category_rules(tmp_path):
+    from ledger.db import add_rule
+    from ledger.rules import apply_category_rules, bulk_reapply_rules
+    conn = bootstrap(str(tmp_path / "db.sqlite3"))
+    chase = add_account(conn, "Card", "Chase", "USD", "card", 0.0)
+    kb = add_account(conn, "Check", "KB", "KRW", "checking", 0.0)
+    for i, (aid, payee) in enumerate([(chase, "STARBUCKS #12"), (chase, "Uber Trip"), (kb, "GS25"),
+                                      (kb, "Starbucks"), (chase, None)]):
+        add_transaction(conn, date_utc=f"2025-10-0{i + 1}T00:00:00Z", amount=1.0, currency="USD",
+                        category="Misc", account_id=aid, direction="debit", payee=payee)
+    add_rule(conn, pattern="[bad", category="Bad", match_type="regex", institution=None, priority=1, enabled=True)
+    add_rule(conn, pattern="star", category="Coffee", match_type="contains", institution="chase", priority=10, enabled=True)
+    add_rule(conn, pattern="^gs\\d+$", category="Convenience", match_type="regex", institution=None, priority=20, enabled=True)
+    add_rule(conn, pattern="uber", category="Off", match_type="contains", institution=None, priority=0, enabled=False)
+
+    expected = {r["id"]: apply_category_rules(conn, payee=r["payee"], institution=r["institution"]) or r["category"]
+                for r in list_transactions_joined(conn, limit=10)}
+    assert bulk_reapply_rules(conn, limit=10) == 2
+    assert {r["id"]: r["category"] for r in list_transactions_joined(conn, limit=10)} == expected
+    assert bulk_reapply_rules(conn, limit=10) == 0  # 이미 반영된 행은 다시 세지 않음
+
+def test_bulk_reapply_rules_non_ascii_case(tmp_path):
+    # SQLite 내장 lower()는 ASCII만 접음 → 'CAFÉ'/'café'도 Python 평가와 같아야 함
+    from ledger.db import add_rule
+    from ledger.rules import apply_category_rules, bulk_reapply_rules
+    conn = bootstrap(str(tmp_path / "db.sqlite3"))
+    aid = add_account(conn, "Card", "Ünion Bank", "USD", "card", 0.0)
+    for i, payee in enumerate(["CAFÉ NERO", "ÜBER EATS"]):
+        add_transaction(conn, date_utc=f"2025-10-0{i + 1}T00:00:00Z", amount=1.0, currency="USD",
+                        category="Misc", account_id=aid, direction="debit", payee=payee)
+    add_rule(conn, pattern="café", category="Coffee", match_type="contains", institution="ünion", priority=10, enabled=True)
+    add_rule(conn, pattern="^über", category="Delivery", match_type="regex", institution=None, priority=20, enabled=True)
+
+    assert apply_category_rules(conn, payee="CAFÉ NERO", institution="Ünion Bank") == "Coffee"
+    assert bulk_reapply_rules(conn, limit=10) == 2
+    assert {r["payee"]: r["category"] for r in list_transactions_joined(conn, limit=10)} == {
+        "CAFÉ NERO": "Coffee", "ÜBER EATS": "Delivery"}